@@ -1,10 +1,14 @@
 import streamlit as st
-from chatbot import MedicalChatbot
+from chatbot import MedicalChatbot, start_engine_warmup
 from styles import load_css
-from search_utils import ArticleSearch
-from datetime import datetime, timedelta
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from search_utils import MIN_SEARCH_LENGTH, ArticleSearch, normalize_query
+from article_store import get_article_store, start_article_refresher
+import time
+from concurrent.futures import wait
+from worker_pool import get_job_runner
+from resilience import configure_upstreams
+from telemetry import configure_telemetry
+from settings import get_setting
 
 # Configuration de la page
 st.set_page_config(
@@ -13,6 +17,15 @@ st.set_page_config(
     layout='wide'
 )
 
+# Disjoncteurs et limites des services externes (Serper, OpenAI), réglés avant tout appel;
+# mêmes sources que le moteur (environnement puis secrets), quel que soit le premier appelant
+configure_upstreams(dict(get_setting("UPSTREAMS", {})))
+# Journal JSON des étapes et export des métriques (fichier ou endpoint Prometheus)
+configure_telemetry(dict(get_setting("TELEMETRY", {})))
+
+# Préchauffage du moteur médical partagé (une seule fois par processus)
+start_engine_warmup()
+
 # Chargement des styles
 st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
 
@@ -21,23 +34,16 @@ if 'language' not in st.session_state:
     st.session_state.language = 'fr'
 if 'terms_accepted' not in st.session_state:
     st.session_state.terms_accepted = False
-if 'last_articles_update' not in st.session_state:
-    st.session_state.last_articles_update = None
-if 'cached_articles' not in st.session_state:
-    st.session_state.cached_articles = None
-if 'is_loading_articles' not in st.session_state:
-    st.session_state.is_loading_articles = False
+if 'search_input_time' not in st.session_state:
+    st.session_state.search_input_time = 0.0
+if 'search_jobs' not in st.session_state:
+    st.session_state.search_jobs = {}
+
+SEARCH_DEBOUNCE_SECONDS = 0.5  # Délai entre la saisie d'une recherche et son envoi à Serper
+SEARCH_POLL_SECONDS = 2  # Attente maximale d'une recherche avant de relancer le script
 
-# Chargement asynchrone des articles
-async def load_articles_async(article_search, language):
-    loop = asyncio.get_event_loop()
-    with ThreadPoolExecutor() as executor:
-        articles = await loop.run_in_executor(
-            executor, 
-            article_search.get_health_articles,
-            language
-        )
-    return articles
+# Boucle et pool de threads partagés par le processus pour les tâches réseau
+job_runner = get_job_runner(dict(get_setting("JOB_LIMITS", {})))
 
 # Fenêtre modale avec conditions
 if not st.session_state.terms_accepted:
@@ -180,32 +186,15 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-current_time = datetime.now()
-should_update = (
-    st.session_state.last_articles_update is None or
-    current_time - st.session_state.last_articles_update > timedelta(hours=12)
-)
-
-if should_update and not st.session_state.is_loading_articles:
-    st.session_state.is_loading_articles = True
-    loading_messages = {
-        'fr': "Chargement des articles...",
-        'en': "Loading articles...",
-        'ru': "Загрузка статей..."
-    }
-    with st.spinner(loading_messages[st.session_state.language]):
-        article_search = ArticleSearch()
-        try:
-            articles = asyncio.run(load_articles_async(article_search, st.session_state.language))
-            st.session_state.cached_articles = articles
-            st.session_state.last_articles_update = current_time
-        except Exception as e:
-            st.error(f"Error loading articles: {str(e)}")
-            articles = st.session_state.cached_articles or []
-        finally:
-            st.session_state.is_loading_articles = False
-else:
-    articles = st.session_state.cached_articles or []
+# Les articles sont préchargés en arrière-plan pour toutes les langues:
+# l'affichage lit le magasin partagé et n'attend jamais Serper
+article_refresher = start_article_refresher(ArticleSearch(), runner=job_runner)
+articles, articles_age = get_article_store().get(st.session_state.language)
+articles_failure = get_article_store().failure(st.session_state.language)
+if articles is None:
+    # Sans effet pendant le délai de nouvelle tentative qui suit un échec
+    article_refresher.refresh_now()
+articles = articles or []
 
 if articles:
     st.markdown("<div class='article-container'>", unsafe_allow_html=True)
@@ -226,6 +215,19 @@ if articles:
                 </a>
             """, unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
+    age_messages = {
+        'fr': "Mis à jour il y a {} min",
+        'en': "Updated {} min ago",
+        'ru': "Обновлено {} мин назад"
+    }
+    st.caption(age_messages[st.session_state.language].format(int(articles_age // 60)))
+elif articles_failure is None:
+    loading_messages = {
+        'fr': "Chargement des articles...",
+        'en': "Loading articles...",
+        'ru': "Загрузка статей..."
+    }
+    st.info(loading_messages[st.session_state.language])
 else:
     error_messages = {
         'fr': "Impossible de charger les articles. Veuillez réessayer plus tard.",
@@ -243,15 +245,63 @@ with st.sidebar:
     }
     search_query = st.text_input(
         "",
-        placeholder=search_placeholders[st.session_state.language]
+        placeholder=search_placeholders[st.session_state.language],
+        key="search_query",
+        on_change=lambda: setattr(st.session_state, "search_input_time", time.time())
     )
     
-    if search_query:
+    normalized_query = normalize_query(search_query)
+    if normalized_query and len(normalized_query) < MIN_SEARCH_LENGTH:
+        min_length_messages = {
+            'fr': f"Saisissez au moins {MIN_SEARCH_LENGTH} caractères",
+            'en': f"Type at least {MIN_SEARCH_LENGTH} characters",
+            'ru': f"Введите не менее {MIN_SEARCH_LENGTH} символов"
+        }
+        st.caption(min_length_messages[st.session_state.language])
+    elif normalized_query:
+        # Résultats déjà dans le cache partagé: affichés sans nouvelle tâche
         article_search = ArticleSearch()
-        search_results = article_search.search_articles(
-            search_query,
-            st.session_state.language
-        )
+        search_results = article_search.cached_articles(normalized_query, st.session_state.language)
+
+        # Sinon la recherche s'exécute dans le pool partagé; le script interroge le Future.
+        # La session garde la dernière recherche, même terminée: un échec (résultat vide
+        # non mis en cache, erreur ou délai dépassé) n'est pas relancé à chaque relance du
+        # script, seulement quand la requête ou la langue change.
+        job_key = (normalized_query, st.session_state.language)
+        search_job = st.session_state.search_jobs.get(job_key)
+        if search_results is not None:
+            st.session_state.search_jobs.pop(job_key, None)
+        elif search_job is None:
+            # Anti-rebond sans bloquer le script: le départ est différé jusqu'à
+            # SEARCH_DEBOUNCE_SECONDS après la saisie, et une nouvelle saisie annule la
+            # recherche précédente avant qu'elle n'atteigne Serper
+            for pending_job in st.session_state.search_jobs.values():
+                pending_job.cancel()
+            search_job = job_runner.submit(
+                "search",
+                article_search.search_articles,
+                normalized_query,
+                st.session_state.language,
+                timeout=15,
+                delay=max(0.0, SEARCH_DEBOUNCE_SECONDS - (time.time() - st.session_state.search_input_time))
+            )
+            st.session_state.search_jobs = {job_key: search_job}
+        if search_results is None:
+            if not search_job.done():
+                searching_messages = {
+                    'fr': "Recherche en cours...",
+                    'en': "Searching...",
+                    'ru': "Идёт поиск..."
+                }
+                with st.spinner(searching_messages[st.session_state.language]):
+                    wait([search_job], timeout=SEARCH_POLL_SECONDS)
+            if not search_job.done():
+                st.rerun()
+            try:
+                search_results = search_job.result()
+            except Exception as e:
+                print(f"Erreur de recherche: {str(e)}")
+                search_results = []
         
         if search_results:
             search_titles = {
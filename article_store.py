@@ -0,0 +1,165 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+LANGUAGES = ('fr', 'en', 'ru')
+
+
+class ArticleStore:
+    """Articles recommandés par langue, partagés par toutes les sessions du processus"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict] = {}
+        self._failures: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, language: str) -> Tuple[Optional[List[Dict]], Optional[float]]:
+        """Renvoie (articles, âge en secondes), ou (None, None) si rien n'est encore chargé"""
+        with self._lock:
+            entry = self._entries.get(language)
+        if entry is None:
+            return None, None
+        return entry["articles"], time.time() - entry["updated_at"]
+
+    def bucket(self, language: str) -> Optional[int]:
+        """Fenêtre de 12 heures à laquelle appartiennent les articles publiés"""
+        with self._lock:
+            entry = self._entries.get(language)
+        return entry["bucket"] if entry else None
+
+    def failure(self, language: str) -> Optional[Dict]:
+        """Dernier échec du chargement ({"error", "failed_at"}), None après une publication"""
+        with self._lock:
+            return self._failures.get(language)
+
+    def publish(self, language: str, articles: List[Dict], bucket: int, updated_at: Optional[float] = None):
+        with self._lock:
+            self._entries[language] = {
+                "articles": articles,
+                "bucket": bucket,
+                "updated_at": updated_at or time.time()
+            }
+            self._failures.pop(language, None)
+
+    def record_failure(self, language: str, error: str):
+        with self._lock:
+            self._failures[language] = {"error": error, "failed_at": time.time()}
+
+
+class ArticleRefresher:
+    """Thread d'arrière-plan qui précharge les articles de toutes les langues avant
+    l'expiration de chaque fenêtre et les publie dans le magasin partagé"""
+
+    def __init__(self, store: ArticleStore, article_search, languages=LANGUAGES,
+                 lead: float = 900, retry_delay: float = 300, runner=None):
+        self.store = store
+        self.article_search = article_search
+        self.runner = runner  # JobRunner partagé; sans lui, les langues sont traitées à la suite
+        self.languages = languages
+        self.lead = lead  # Avance du préchargement sur la fin de la fenêtre (secondes)
+        self.retry_delay = retry_delay
+        self._failed_at: Optional[float] = None  # Dernier passage en échec
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="article-refresher", daemon=True)
+
+    def start(self) -> "ArticleRefresher":
+        self._thread.start()
+        return self
+
+    def refresh_now(self) -> bool:
+        """Demande un rafraîchissement immédiat (sans attendre). Ignorée pendant
+        retry_delay après un échec: chaque affichage peut la demander sans
+        multiplier les appels à Serper. Renvoie False si la demande est ignorée."""
+        failed_at = self._failed_at
+        if failed_at is not None and time.time() - failed_at < self.retry_delay:
+            return False
+        self._wakeup.set()
+        return True
+
+    def _target_bucket(self, now: float) -> int:
+        period = self.article_search.cache_timeout
+        current = int(now) // period * period
+        # Proche de la fin de la fenêtre: on prépare déjà la suivante
+        return current + period if current + period - now <= self.lead else current
+
+    def refresh_once(self, now: Optional[float] = None) -> bool:
+        """Met à jour les langues dont les articles ne sont pas ceux de la fenêtre visée;
+        renvoie False si au moins une langue a échoué"""
+        target = self._target_bucket(time.time() if now is None else now)
+        languages = [language for language in self.languages if self.store.bucket(language) != target]
+        timeout = self.article_search.articles_budget + 5
+        futures = {}
+        # fresh: le cache contient encore les résultats de la fenêtre courante, qui
+        # seraient sinon servis (et publiés) sous la fenêtre suivante
+        if self.runner is not None:
+            # Toutes les langues en parallèle, dans la limite de la file "articles"
+            for language in languages:
+                futures[language] = self.runner.submit(
+                    "articles", self.article_search.get_health_articles, language, target, True,
+                    timeout=timeout
+                )
+
+        ok = True
+        for language in languages:
+            try:
+                if language in futures:
+                    articles = futures[language].result()
+                else:
+                    articles = self.article_search.get_health_articles(language, timestamp=target, fresh=True)
+            except Exception as e:
+                print(f"Erreur de préchargement des articles ({language}): {str(e)}")
+                error = str(e) or type(e).__name__
+                articles = []
+            else:
+                error = "aucun article"
+            if articles:
+                self.store.publish(language, articles, target)
+            else:
+                # Sans article publié, l'affichage passe de "Chargement" à l'avertissement
+                self.store.record_failure(language, error)
+                ok = False
+        self._failed_at = None if ok else time.time()
+        return ok
+
+    def _next_delay(self, ok: bool) -> float:
+        now = time.time()
+        period = self.article_search.cache_timeout
+        next_boundary = int(now) // period * period + period
+        delay = next_boundary - self.lead - now
+        if delay <= 0:
+            delay = next_boundary - now
+        if not ok:
+            delay = min(delay, self.retry_delay)
+        return max(delay, 1.0)
+
+    def _run(self):
+        while True:
+            ok = self.refresh_once()
+            if not ok:
+                # Demandes reçues pendant un passage en échec: nouvelle tentative après retry_delay
+                self._wakeup.clear()
+            self._wakeup.wait(self._next_delay(ok))
+            self._wakeup.clear()
+
+
+_store = ArticleStore()
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_article_store() -> ArticleStore:
+    return _store
+
+
+def start_article_refresher(article_search, runner=None) -> ArticleRefresher:
+    """Démarre une seule fois par processus le préchargement des articles"""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            # Instantané disque: contenu servi tout de suite, même périmé ou hors ligne;
+            # le thread le remplace dès que la fenêtre courante est chargée
+            for language, entry in article_search.load_snapshot().items():
+                if entry.get("articles"):
+                    _store.publish(language, entry["articles"], entry.get("bucket"), entry.get("updated_at"))
+            _refresher = ArticleRefresher(_store, article_search, runner=runner).start()
+        return _refresher
@@ -0,0 +1,89 @@
+"""Triage par lots sans interface: python batch_triage.py requetes.jsonl -o resultats.jsonl
+
+Chaque ligne d'entrée est un objet JSON avec au moins "query" (les autres champs,
+par exemple "id" ou "expected", sont recopiés dans la sortie). La configuration est
+lue dans l'environnement ou dans .streamlit/secrets.toml (voir settings.get_setting)."""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from context_builder import parse_fields
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_CONCURRENCY = 4
+
+
+def _batches(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def triage(records: Iterable[Dict], engine, batch_size: int = DEFAULT_BATCH_SIZE,
+           concurrency: int = DEFAULT_CONCURRENCY, with_llm: bool = True) -> Iterator[Dict]:
+    """Traite les requêtes par lots et renvoie les résultats dans l'ordre d'entrée:
+    un appel d'embedding et une recherche vectorielle par lot, puis au plus
+    concurrency appels au modèle simultanés"""
+    k = engine.context_builder.max_documents * 2
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="triage") as executor:
+        for batch in _batches(records, batch_size):
+            queries = [record["query"] for record in batch]
+            vectors = engine.embeddings.embed_documents(queries)
+            candidates = engine.retrieve_many(queries, vectors, k=k)
+
+            def answer(position: int) -> Dict:
+                result = dict(batch[position])
+                result["retrieved"] = [parse_fields(content).get("Médicament", "") for content in candidates[position]]
+                if not with_llm:
+                    return result
+                start = time.perf_counter()
+                try:
+                    messages = engine.prompt_messages(queries[position], candidates[position])
+                    result["sections"] = engine.complete(messages)
+                except Exception as e:
+                    result["error"] = str(e)
+                result["llm_seconds"] = round(time.perf_counter() - start, 3)
+                return result
+
+            # map conserve l'ordre: chaque résultat est écrit dès que ses prédécesseurs sont prêts
+            yield from executor.map(answer, range(len(batch)))
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Triage de symptômes par lots (JSONL)")
+    parser.add_argument("input", help="fichier JSONL d'entrée (un objet avec \"query\" par ligne)")
+    parser.add_argument("-o", "--output", required=True, help="fichier JSONL de sortie")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--no-llm", action="store_true", help="recherche seule, sans appel au modèle")
+    args = parser.parse_args()
+
+    from chatbot import MedicalEngine
+
+    engine = MedicalEngine()
+    start = time.perf_counter()
+    count = errors = 0
+    with open(args.output, "w", encoding="utf-8") as out:
+        for result in triage(read_jsonl(args.input), engine, args.batch_size, args.concurrency, not args.no_llm):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            count += 1
+            errors += "error" in result
+    elapsed = time.perf_counter() - start
+    print(f"{count} requêtes en {elapsed:.1f}s ({count / elapsed if elapsed else 0:.1f}/s), "
+          f"{errors} erreurs", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
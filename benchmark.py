@@ -0,0 +1,660 @@
+"""Micro-benchmarks de LIBERCARE.
+
+Usage: python benchmark.py <nom> (voir python benchmark.py --help)
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from embedding_backends import HashingEmbeddings
+from medical_index import build_medical_documents
+
+MEDICATIONS_CSV = "medicaments_propre.csv"
+
+
+def _timeit(func: Callable, repeat: int = 5) -> float:
+    """Médiane des durées d'exécution en secondes"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def legacy_prepare_documents(medications: pd.DataFrame) -> List[Dict]:
+    """Ancienne préparation des documents (boucle iterrows), conservée pour comparaison"""
+    documents = []
+    for _, med in medications.iterrows():
+        content = f"Médicament: {med['titre']}\n"
+        metadata = {
+            "name": med['titre'],
+            "category": med.get('categorie', ''),
+            "symptoms": med.get('symptomes', ''),
+            "posologie": med.get('posologie', ''),
+            "contre_indication": med.get('contre_indication', ''),
+            "grossesse_allaitement": med.get('grossesse_allaitement_fertilite', ''),
+            "effet_indesirable": med.get('effet_indesirable', '')
+        }
+        content += "\n".join([
+            f"Catégorie: {metadata['category']}",
+            f"Symptômes: {metadata['symptoms']}",
+            f"Posologie: {metadata['posologie']}",
+            f"Contre-indications: {metadata['contre_indication']}"
+        ])
+        documents.append({"content": content, "metadata": metadata})
+    return documents
+
+
+def bench_documents(args):
+    """Préparation des documents: boucle iterrows contre construction vectorisée"""
+    medications = pd.read_csv(MEDICATIONS_CSV)
+    print(f"{'taille':>8} {'lignes':>8} {'iterrows (s)':>14} {'vectorisé (s)':>14} {'gain':>7}")
+    for factor in (1, 10, 100):
+        frame = pd.concat([medications] * factor, ignore_index=True)
+        repeat = 1 if factor == 100 else 3
+        legacy = _timeit(lambda: legacy_prepare_documents(frame), repeat)
+        vectorized = _timeit(lambda: build_medical_documents(frame), repeat)
+        print(f"{factor:>7}x {len(frame):>8} {legacy:>14.3f} {vectorized:>14.3f} {legacy / vectorized:>6.1f}x")
+
+
+def _percentiles(durations: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 en millisecondes"""
+    values = np.asarray(durations) * 1000
+    return {f"p{q}": float(np.percentile(values, q)) for q in (50, 95, 99)}
+
+
+def bench_vector_search(args):
+    """Recherche top-5: wrapper Chroma contre index NumPy exact en mémoire"""
+    from langchain.vectorstores import Chroma
+    from vector_index import NumpyVectorIndex
+
+    documents = build_medical_documents(pd.read_csv(MEDICATIONS_CSV))
+    embeddings = HashingEmbeddings()
+    queries = [doc.metadata["symptoms"][:120] for doc in random.Random(0).sample(documents, 200)]
+    query_vectors = embeddings.embed_documents(queries)
+
+    with tempfile.TemporaryDirectory() as directory:
+        chroma = Chroma.from_texts(
+            texts=[doc.content for doc in documents],
+            metadatas=[doc.metadata for doc in documents],
+            embedding=embeddings,
+            persist_directory=directory
+        )
+        numpy_index = NumpyVectorIndex.from_chroma(chroma)
+        numpy_index.save(directory + "/numpy_index")
+        numpy_index = NumpyVectorIndex.load(directory + "/numpy_index")
+
+        results = {}
+        agreement = []
+        for name, index in (("chroma", chroma), ("numpy", numpy_index)):
+            durations = []
+            for vector in query_vectors:
+                start = time.perf_counter()
+                index.similarity_search_by_vector(vector, k=5)
+                durations.append(time.perf_counter() - start)
+            results[name] = _percentiles(durations)
+        for vector in query_vectors:
+            expected = {d.metadata["name"] for d in chroma.similarity_search_by_vector(vector, k=5)}
+            found = {d.metadata["name"] for d in numpy_index.similarity_search_by_vector(vector, k=5)}
+            agreement.append(len(expected & found) / 5)
+
+    print(f"{len(documents)} documents, {len(queries)} requêtes, k=5")
+    for name, stats in results.items():
+        print(f"{name:>7}: p50 {stats['p50']:.3f} ms  p99 {stats['p99']:.3f} ms")
+    print(f"Recouvrement moyen des top-5: {statistics.mean(agreement):.1%}")
+
+
+def bench_serper(args):
+    """Chargement à froid des articles contre un serveur Serper local (latence simulée)"""
+    import requests
+    from search_utils import ArticleSearch
+    from stub_servers import StubSerperServer
+
+    latency = 0.2
+    with StubSerperServer(latency=latency) as server:
+        queries = [f"requête santé {i}" for i in range(5)]
+
+        # Ancien comportement: cinq requêtes successives, sans réutilisation de connexion
+        start = time.perf_counter()
+        for query in queries:
+            requests.post(server.url, json={"q": query, "num": 30}, timeout=10).json()
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        articles = ArticleSearch(api_key="stub", base_url=server.url).get_health_articles('fr')
+        parallel = time.perf_counter() - start
+
+    print(f"Latence simulée par requête: {latency * 1000:.0f} ms, {len(queries)} sujets")
+    print(f"Séquentiel: {sequential:.3f} s   Parallèle: {parallel:.3f} s   ({len(articles)} articles)")
+
+
+LEGACY_EXCLUDED_TERMS = [
+    'amazon', 'boutique', 'shop', 'achat', 'prix', 'магазин', 'купить', 'аптека',
+    'buy', 'order', 'purchase', 'discount', 'deal', 'offer', 'promo', 'sale',
+    'заказать', 'скидка', 'акция', 'распродажа', 'цена', 'стоимость'
+]
+
+
+def legacy_filter_results(items: List[Dict], excluded_terms: List[str]) -> List[Dict]:
+    """Ancien filtrage de search_articles (boucles de sous-chaînes), conservé pour comparaison"""
+    kept = []
+    for item in items:
+        title = item.get('title', '').lower()
+        link = item.get('link', '').lower()
+        snippet = item.get('snippet', '').lower()
+        if any(term in title or term in link or term in snippet for term in excluded_terms):
+            continue
+        if any(domain in link for domain in ['amazon.', 'ebay.', 'pharmacy.', 'apteka.']):
+            continue
+        kept.append(item)
+    return kept
+
+
+def bench_content_filter(args):
+    """Filtrage de résultats de recherche: boucles de sous-chaînes contre filtre compilé,
+    avec les règles actuelles puis des listes de termes 5 et 20 fois plus longues"""
+    from content_filter import DEFAULT_FILTER_RULES, ContentFilter
+
+    rng = random.Random(0)
+    words = ["santé", "sommeil", "plantes", "tisane", "здоровье", "nutrition", "yoga", "stress"]
+    commercial = ["promo", "купить", "boutique", "discount"]
+    domains = ["doctissimo.fr", "healthline.com", "amazon.fr", "medportal.ru", "example.org"]
+    items = []
+    for i in range(20000):
+        title = " ".join(rng.choice(words) for _ in range(8))
+        if i % 10 == 0:
+            title += " " + rng.choice(commercial)
+        items.append({
+            "title": title,
+            "link": f"https://www.{rng.choice(domains)}/article-{i}",
+            "snippet": " ".join(rng.choice(words) for _ in range(25))
+        })
+
+    fields = ("title", "link", "snippet")
+    print(f"{len(items)} résultats")
+    print(f"{'termes':>7} {'sous-chaînes (ms)':>18} {'filtre compilé (ms)':>20}")
+    for factor in (1, 5, 20):
+        # Termes supplémentaires fictifs pour mesurer l'effet de la taille des règles
+        terms = LEGACY_EXCLUDED_TERMS + [f"{term}x{i}" for i in range(factor - 1) for term in LEGACY_EXCLUDED_TERMS]
+        content_filter = ContentFilter(terms, DEFAULT_FILTER_RULES["news_blocked_domains"])
+        legacy = _timeit(lambda: legacy_filter_results(items, terms), 3)
+        compiled = _timeit(lambda: content_filter.filter_results(items, fields), 3)
+        print(f"{len(terms):>7} {legacy * 1000:>18.1f} {compiled * 1000:>20.1f}")
+
+    content_filter = ContentFilter.from_rules()
+    trusted_domains = DEFAULT_FILTER_RULES["trusted_domains"]
+    legacy = _timeit(lambda: [any(d in item["link"].lower() for d in trusted_domains) for item in items])
+    trusted = _timeit(lambda: [content_filter.is_trusted(item["link"]) for item in items])
+    print(f"Domaines de confiance: sous-chaînes {legacy * 1000:.1f} ms, nom d'hôte + ensemble {trusted * 1000:.1f} ms")
+
+
+def bench_lexical(args):
+    """Index lexical des médicaments: construction, recherche directe par nom et BM25"""
+    from lexical_index import LexicalIndex
+    from medication_table import MedicationTable
+
+    with tempfile.TemporaryDirectory() as directory:
+        table = MedicationTable.build(MEDICATIONS_CSV, f"{directory}/medications.arrow")
+        start = time.perf_counter()
+        index = LexicalIndex(table)
+        print(f"Construction: {(time.perf_counter() - start) * 1000:.0f} ms pour {len(table)} médicaments")
+        names = table.column("titre")[::7]
+        queries = {
+            "nom exact": [f"{name} posologie" for name in names],
+            "nom approché": [name.split()[0].lower()[:-1] + "e" for name in names if len(name.split()[0]) >= 6],
+            "symptômes (BM25)": ["toux grasse", "mal de gorge", "brûlures d'estomac", "constipation",
+                                 "douleurs musculaires", "fatigue passagère", "nez bouché", "insomnie"] * 20
+        }
+        for label, batch in queries.items():
+            durations = []
+            for query in batch:
+                start = time.perf_counter()
+                if label.startswith("symptômes"):
+                    index.search(query, k=5)
+                else:
+                    index.find_medications(query)
+                durations.append(time.perf_counter() - start)
+            stats = {key: value * 1000 for key, value in _percentiles(durations).items()}
+            print(f"{label:<18} {len(batch):>5} requêtes  p50 {stats['p50']:.0f} µs  p95 {stats['p95']:.0f} µs")
+
+
+def legacy_render_html(medications: List[str], remedies: List[str], precautions: List[str]) -> str:
+    """Ancien rendu HTML (concaténations et styles en ligne), conservé pour comparaison"""
+    html_response = """
+    <div style="display: flex; flex-direction: column; gap: 20px;">
+        <div style="display: flex; gap: 20px; flex-wrap: wrap;">
+            <div style="flex: 1; min-width: 300px; background-color: rgba(47, 53, 66, 0.8); padding: 15px; border-radius: 8px; color: white; margin-bottom: 10px;">
+                <h3 style="color: #2196f3;">💊 Médicaments recommandés</h3>
+                <ul style="list-style-type: none; padding-left: 0;">
+    """
+    for med in medications:
+        if med.strip():
+            html_response += f'<li style="margin-bottom: 10px; padding-left: 20px; position: relative;">{med}</li>'
+    html_response += """
+                </ul>
+            </div>
+            <div style="flex: 1; min-width: 300px; background-color: rgba(47, 53, 66, 0.8); padding: 15px; border-radius: 8px; color: white; margin-bottom: 10px;">
+                <h3 style="color: #4caf50;">🌿 Remèdes naturels</h3>
+                <ul style="list-style-type: none; padding-left: 0;">
+    """
+    for remedy in remedies:
+        if remedy.strip():
+            html_response += f'<li style="margin-bottom: 10px; padding-left: 20px; position: relative;">{remedy}</li>'
+    html_response += """
+                </ul>
+            </div>
+        </div>
+    """
+    if precautions:
+        html_response += """
+        <div style="background-color: rgba(255, 152, 0, 0.2); padding: 15px; border-radius: 8px; color: white; margin-bottom: 10px;">
+            <h3 style="color: #ff9800;">⚠️ Précautions</h3>
+            <ul style="list-style-type: none; padding-left: 0;">
+        """
+        for precaution in precautions:
+            if precaution.strip():
+                html_response += f'<li style="margin-bottom: 10px; padding-left: 20px; position: relative;">{precaution}</li>'
+        html_response += """
+            </ul>
+        </div>
+        """
+    html_response += """
+    </div>
+    """
+    return html_response
+
+
+def legacy_postprocess(response_content: str) -> str:
+    """Ancien traitement de la réponse du modèle (trois découpages split), conservé pour comparaison"""
+    medications = []
+    remedies = []
+    precautions = []
+    parts = response_content.split("💊")
+    if len(parts) > 1:
+        medications_part = parts[1].split("🌿")[0] if "🌿" in parts[1] else parts[1]
+        medications = [med.strip() for med in medications_part.strip().split("\n") if med.strip()]
+    parts = response_content.split("🌿")
+    if len(parts) > 1:
+        remedies_part = parts[1].split("⚠️")[0] if "⚠️" in parts[1] else parts[1]
+        remedies = [rem.strip() for rem in remedies_part.strip().split("\n") if rem.strip()]
+    parts = response_content.split("⚠️")
+    if len(parts) > 1:
+        precautions = [prec.strip() for prec in parts[1].strip().split("\n") if prec.strip()]
+    return legacy_render_html(medications, remedies, precautions)
+
+
+def sample_completions(count: int, items: int = 5, seed: int = 0) -> List[str]:
+    """Réponses de modèle synthétiques au format attendu (sections 💊, 🌿, ⚠️)"""
+    rng = random.Random(seed)
+    words = ["comprimé", "posologie", "douleur", "fièvre", "infusion", "repos", "adulte", "enfant",
+             "contre-indiqué", "grossesse", "gélule", "tisane", "hydratation"]
+
+    def sentence(n: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    completions = []
+    for _ in range(count):
+        lines = ["1. 💊 Médicaments recommandés:"]
+        lines += [f"- MÉDICAMENT {i} (substance): {sentence(25)}" for i in range(items)]
+        lines += ["", "2. 🌿 Remèdes naturels:"]
+        lines += [f"- {sentence(15)}" for _ in range(items)]
+        lines += ["", "⚠️ Précautions:"]
+        lines += [f"- {sentence(12)}" for _ in range(max(1, items // 2))]
+        completions.append("\n".join(lines))
+    return completions
+
+
+def bench_response(args):
+    """Post-traitement d'une réponse du modèle: trois split + concaténations à styles en
+    ligne, contre analyse en un passage + gabarit à classes CSS, pour des réponses de
+    plus en plus longues"""
+    from response_parser import parse_response
+    from response_renderer import render_sections
+
+    print(f"{'éléments':>9} {'legacy (µs)':>12} {'nouveau (µs)':>13} {'HTML legacy (o)':>16} {'HTML nouveau (o)':>17}")
+    for items in (5, 20, 80):
+        completions = sample_completions(200, items)
+        legacy = _timeit(lambda: [legacy_postprocess(text) for text in completions])
+        current = _timeit(lambda: [render_sections(*parse_response(text)) for text in completions])
+        legacy_size = statistics.mean(len(legacy_postprocess(text)) for text in completions)
+        current_size = statistics.mean(len(render_sections(*parse_response(text))) for text in completions)
+        print(f"{items:>9} {legacy / len(completions) * 1e6:>12.1f} {current / len(completions) * 1e6:>13.1f} "
+              f"{legacy_size:>16.0f} {current_size:>17.0f}")
+
+
+CONTEXT_QUERIES = [
+    "toux grasse", "mal de gorge", "brûlures d'estomac", "constipation", "douleurs musculaires",
+    "fatigue passagère", "nez bouché", "insomnie", "diarrhée", "mycose des ongles",
+    "bouffées de chaleur ménopause", "fièvre et courbatures", "allergie pollen", "hémorroïdes"
+]
+
+
+def bench_context(args):
+    """Contexte du prompt: concaténation des 5 premiers documents contre contexte
+    borné en tokens (fiches dédoublonnées, champs tronqués par priorité).
+    La recherche BM25 de l'index lexical remplace ici la recherche vectorielle."""
+    from context_builder import ContextBuilder, TokenCounter
+    from lexical_index import LexicalIndex
+    from medical_index import document_content
+    from medication_table import MedicationTable
+
+    counter = TokenCounter()
+    with tempfile.TemporaryDirectory() as directory:
+        table = MedicationTable.build(MEDICATIONS_CSV, f"{directory}/medications.arrow")
+        index = LexicalIndex(table)
+        candidates = [
+            [document_content(table.row(i)) for i, _ in index.search(query, k=10)]
+            for query in CONTEXT_QUERIES
+        ]
+
+    legacy_tokens = []
+    for contents in candidates:
+        context = ""
+        for content in contents[:5]:
+            context += f"\n---\n{content}\n"
+        legacy_tokens.append(counter.count(context))
+    print(f"Comptage: {'tiktoken' if counter.encoding is not None else 'approximatif (4 car./token)'}")
+    print(f"{'budget':>8} {'tokens moyen':>13} {'tokens max':>11} {'fiches':>7} {'construction (ms)':>18}")
+    print(f"{'aucun':>8} {statistics.mean(legacy_tokens):>13.0f} {max(legacy_tokens):>11} {5:>7} {'-':>18}")
+    for budget in (1600, 1200, 800):
+        builder = ContextBuilder(budget=budget, counter=counter)
+        results = [builder.build(contents) for contents in candidates]
+        tokens = [count for _, count in results]
+        documents = statistics.mean(context.count("\n---\n") for context, _ in results)
+        duration = _timeit(lambda: [builder.build(contents) for contents in candidates]) / len(candidates)
+        print(f"{budget:>8} {statistics.mean(tokens):>13.0f} {max(tokens):>11} {documents:>7.1f} {duration * 1000:>18.2f}")
+
+
+def bench_history(args):
+    """Historique de conversation après N tours: réponses HTML complètes conservées
+    sans limite contre messages structurés bornés, taille par session et rendu par relance"""
+    from chat_history import (
+        DEFAULT_HISTORY_LIMIT, append_message, assistant_message, history_bytes, user_message
+    )
+    from response_renderer import render_history_sections
+
+    rng = random.Random(0)
+    words = ["comprimé", "posologie", "douleur", "fièvre", "infusion", "repos", "adulte", "enfant"]
+
+    def sentence(n: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    def sections() -> Dict[str, List[str]]:
+        return {
+            "medications": [f"{i}. MÉDICAMENT {i}: {sentence(30)}" for i in range(1, 6)],
+            "remedies": [f"{i}. {sentence(20)}" for i in range(1, 6)],
+            "precautions": [sentence(15) for _ in range(3)]
+        }
+
+    print(f"{'tours':>6} {'HTML illimité (Ko)':>19} {'structuré borné (Ko)':>21} {'rendu relance (ms)':>19}")
+    for turns in (10, 50, 200):
+        legacy, bounded = [], []
+        for _ in range(turns):
+            question, answer = sentence(8), sections()
+            legacy += [{"role": "user", "content": question},
+                       {"role": "assistant", "content": legacy_render_html(**answer)}]
+            append_message(bounded, user_message(question), DEFAULT_HISTORY_LIMIT)
+            append_message(bounded, assistant_message(answer), DEFAULT_HISTORY_LIMIT)
+
+        def rerun():
+            for message in bounded:
+                if "sections" in message:
+                    render_history_sections(*(tuple(message["sections"][key])
+                                              for key in ("medications", "remedies", "precautions")))
+
+        rerun()  # Premier rendu: remplit le cache
+        print(f"{turns:>6} {history_bytes(legacy) / 1024:>19.1f} {history_bytes(bounded) / 1024:>21.1f} "
+              f"{_timeit(rerun) * 1000:>19.3f}")
+
+
+_STARTUP_SCRIPT = """
+import json, sys, time
+import pandas as pd
+import pyarrow
+from medication_table import MedicationTable
+
+def rss():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+
+before = rss()
+start = time.perf_counter()
+if sys.argv[1] == "csv":
+    medications = pd.read_csv(sys.argv[2])
+    titles = medications["titre"].tolist()
+else:
+    medications = MedicationTable(sys.argv[2])
+    titles = medications.column("titre")
+print(json.dumps({"seconds": time.perf_counter() - start, "rss_mb": rss() - before}))
+"""
+
+
+def bench_table(args):
+    """Chargement de la table des médicaments dans un processus neuf: CSV lu par pandas
+    contre table Arrow projetée en mémoire (temps et mémoire résidente ajoutée)"""
+    import json
+    import os
+    import subprocess
+    import sys
+    from medication_table import MedicationTable
+
+    def run(mode: str, path: str) -> Dict[str, float]:
+        runs = []
+        for _ in range(5):
+            output = subprocess.run(
+                [sys.executable, "-c", _STARTUP_SCRIPT, mode, path],
+                capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+            ).stdout
+            runs.append(json.loads(output))
+        return {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = f"{directory}/medications.arrow"
+        MedicationTable.build(MEDICATIONS_CSV, path)
+        print(f"CSV {os.path.getsize(MEDICATIONS_CSV) / 1e6:.1f} Mo, Arrow {os.path.getsize(path) / 1e6:.1f} Mo")
+        print(f"{'format':<16} {'chargement (ms)':>16} {'RSS ajoutée (Mo)':>17}")
+        for label, mode, source in (("CSV (pandas)", "csv", MEDICATIONS_CSV), ("Arrow (mmap)", "arrow", path)):
+            result = run(mode, os.path.abspath(source))
+            print(f"{label:<16} {result['seconds'] * 1000:>16.1f} {result['rss_mb']:>17.1f}")
+
+
+RETRIEVAL_QUERIES = "retrieval_queries.json"
+RETRIEVAL_REPORT = "retrieval_report.json"
+# Baisse de rappel ou de MRR tolérée par rapport au rapport de référence
+REGRESSION_TOLERANCE = 0.01
+# Taille maximale d'un ajout dans une collection Chroma
+CHROMA_BATCH_SIZE = 5000
+
+
+def _scaled_corpus(vectors: np.ndarray, documents: List, factor: int, seed: int = 0):
+    """Corpus agrandi factor fois: les vecteurs réels, puis des copies aux coordonnées
+    permutées (même distribution de valeurs, sans lien avec les requêtes) sous
+    des noms distincts, qui ne comptent donc jamais comme pertinentes"""
+    rng = np.random.default_rng(seed)
+    blocks = [vectors]
+    contents = [doc.content for doc in documents]
+    names = [doc.metadata["name"] for doc in documents]
+    for copy in range(1, factor):
+        blocks.append(vectors[:, rng.permutation(vectors.shape[1])])
+        contents += [doc.content for doc in documents]
+        names += [f"{doc.metadata['name']} #{copy}" for doc in documents]
+    return np.vstack(blocks), contents, names
+
+
+def _retrieval_numpy(vectors: np.ndarray, contents: List[str], names: List[str], directory: str) -> Callable:
+    from langchain.schema import Document
+    from vector_index import NumpyVectorIndex
+
+    documents = [Document(page_content=text, metadata={"name": name}) for text, name in zip(contents, names)]
+    index = NumpyVectorIndex(NumpyVectorIndex._normalize(vectors), documents)
+    return lambda vector, k: [doc.metadata["name"] for doc in index.similarity_search_by_vector(vector, k=k)]
+
+
+def _retrieval_chroma(vectors: np.ndarray, contents: List[str], names: List[str], directory: str) -> Callable:
+    from langchain.vectorstores import Chroma
+
+    # Vecteurs ajoutés directement: aucun appel d'embedding pendant la construction
+    store = Chroma(collection_name="retrieval", persist_directory=directory)
+    for start in range(0, len(vectors), CHROMA_BATCH_SIZE):
+        end = min(start + CHROMA_BATCH_SIZE, len(vectors))
+        store._collection.add(
+            ids=[str(i) for i in range(start, end)],
+            embeddings=vectors[start:end].tolist(),
+            documents=contents[start:end],
+            metadatas=[{"name": name} for name in names[start:end]]
+        )
+    return lambda vector, k: [doc.metadata["name"] for doc in store.similarity_search_by_vector(vector, k=k)]
+
+
+RETRIEVAL_BACKENDS = {
+    "chroma": _retrieval_chroma,
+    "numpy": _retrieval_numpy
+}
+
+
+def _ranking_metrics(found: List[str], relevant: set, k: int) -> Dict[str, float]:
+    """Rappel@k (borné par le nombre de fiches pertinentes) et rang réciproque"""
+    hits = [name in relevant for name in found[:k]]
+    return {
+        "recall": sum(hits) / min(k, len(relevant)),
+        "reciprocal_rank": 1 / (hits.index(True) + 1) if True in hits else 0.0
+    }
+
+
+def _compare_reports(report: Dict, baseline: Dict) -> bool:
+    """Affiche les écarts avec le rapport de référence; False si la qualité a baissé"""
+    previous = {(r["backend"], r["scale"]): r for r in baseline["results"]}
+    regressed = False
+    for result in report["results"]:
+        old = previous.get((result["backend"], result["scale"]))
+        if old is None:
+            continue
+        deltas = {key: result[key] - old[key] for key in ("recall_at_k", "mrr")}
+        p95 = result["latency_ms"]["p95"] / old["latency_ms"]["p95"] if old["latency_ms"]["p95"] else 1.0
+        worse = [key for key, delta in deltas.items() if delta < -REGRESSION_TOLERANCE]
+        regressed = regressed or bool(worse)
+        print(f"{result['backend']:>7} {result['scale']:>4}x  rappel {deltas['recall_at_k']:+.3f}  "
+              f"MRR {deltas['mrr']:+.3f}  p95 x{p95:.2f}" + ("  RÉGRESSION" if worse else ""))
+    return not regressed
+
+
+def bench_retrieval(args):
+    """Qualité et latence de la recherche vectorielle sur les requêtes annotées de
+    retrieval_queries.json (symptôme -> titres attendus), par backend et taille de corpus.
+    Le rapport JSON peut servir de référence (--baseline) pour détecter les régressions."""
+    import json
+    import sys
+    from datetime import datetime, timezone
+    from embedding_backends import EMBEDDING_CACHE_PATH, create_embeddings
+    from settings import get_setting
+
+    with open(RETRIEVAL_QUERIES, encoding="utf-8") as f:
+        labeled = json.load(f)
+    documents = build_medical_documents(pd.read_csv(MEDICATIONS_CSV))
+    embeddings = create_embeddings(
+        args.embedding,
+        api_key=get_setting("OpenAI_key") if args.embedding == "openai" else None,
+        # Les embeddings hashing sont instantanés; les autres sont mis en cache entre deux exécutions
+        cache_path=None if args.embedding == "hashing" else EMBEDDING_CACHE_PATH
+    )
+    vectors = np.asarray(embeddings.embed_documents([doc.content for doc in documents]), dtype=np.float32)
+    query_vectors = embeddings.embed_documents([item["query"] for item in labeled])
+    relevant = [set(item["expected"]) for item in labeled]
+    k = args.k
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "embedding": args.embedding,
+        "k": k,
+        "queries": len(labeled),
+        "documents": len(documents),
+        "results": []
+    }
+    print(f"{len(documents)} documents, {len(labeled)} requêtes annotées, k={k}, embeddings {args.embedding}")
+    print(f"{'backend':>7} {'corpus':>9} {'construction':>12} {'rappel@k':>9} {'MRR':>6} "
+          f"{'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for scale in (int(value) for value in args.scales.split(",")):
+        corpus = _scaled_corpus(vectors, documents, scale)
+        for backend in args.backends.split(","):
+            with tempfile.TemporaryDirectory() as directory:
+                start = time.perf_counter()
+                search = RETRIEVAL_BACKENDS[backend](*corpus, directory)
+                build_seconds = time.perf_counter() - start
+
+                search(query_vectors[0], k)
+                durations = []
+                for _ in range(args.repeat):
+                    for vector in query_vectors:
+                        start = time.perf_counter()
+                        search(vector, k)
+                        durations.append(time.perf_counter() - start)
+                per_query = [
+                    dict(query=item["query"], **_ranking_metrics(search(vector, k), expected, k))
+                    for item, vector, expected in zip(labeled, query_vectors, relevant)
+                ]
+
+            result = {
+                "backend": backend,
+                "scale": scale,
+                "documents": len(corpus[0]),
+                "build_seconds": round(build_seconds, 3),
+                "recall_at_k": statistics.mean(q["recall"] for q in per_query),
+                "mrr": statistics.mean(q["reciprocal_rank"] for q in per_query),
+                "latency_ms": _percentiles(durations),
+                "per_query": per_query
+            }
+            report["results"].append(result)
+            latency = result["latency_ms"]
+            print(f"{backend:>7} {result['documents']:>9} {build_seconds:>11.1f}s {result['recall_at_k']:>9.3f} "
+                  f"{result['mrr']:>6.3f} {latency['p50']:>9.3f} {latency['p95']:>9.3f} {latency['p99']:>9.3f}")
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Rapport écrit dans {args.report}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not _compare_reports(report, baseline):
+            sys.exit(1)
+
+
+BENCHMARKS = {
+    "content-filter": bench_content_filter,
+    "context": bench_context,
+    "documents": bench_documents,
+    "history": bench_history,
+    "lexical": bench_lexical,
+    "response": bench_response,
+    "retrieval": bench_retrieval,
+    "serper": bench_serper,
+    "table": bench_table,
+    "vector-search": bench_vector_search
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de LIBERCARE")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    retrieval = parser.add_argument_group("retrieval")
+    retrieval.add_argument("--k", type=int, default=5, help="nombre de résultats par recherche")
+    retrieval.add_argument("--scales", default="1,10,100", help="tailles du corpus (multiples du CSV)")
+    retrieval.add_argument("--backends", default=",".join(RETRIEVAL_BACKENDS),
+                           help=f"backends à comparer parmi {', '.join(RETRIEVAL_BACKENDS)}")
+    retrieval.add_argument("--embedding", default="hashing", choices=["hashing", "local", "openai"])
+    retrieval.add_argument("--repeat", type=int, default=5, help="passages des requêtes pour la latence")
+    retrieval.add_argument("--report", default=RETRIEVAL_REPORT, help="rapport JSON écrit")
+    retrieval.add_argument("--baseline", help="rapport de référence: code de sortie 1 si la qualité baisse")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
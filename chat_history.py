@@ -0,0 +1,44 @@
+import json
+from typing import Dict, List, Optional
+
+# Nombre maximal de messages (questions + réponses) conservés par session
+DEFAULT_HISTORY_LIMIT = 20
+# Nombre de questions retirées dont on garde un rappel (résumé des sujets précédents)
+SUMMARY_TOPICS = 5
+TOPIC_LENGTH = 60
+
+
+def user_message(text: str) -> Dict:
+    return {"role": "user", "text": text}
+
+
+def assistant_message(sections: Optional[Dict[str, List[str]]] = None, text: Optional[str] = None) -> Dict:
+    """Réponse stockée sous forme structurée (sections) ou texte simple, jamais en HTML"""
+    if sections is not None:
+        return {"role": "assistant", "sections": sections}
+    return {"role": "assistant", "text": text or ""}
+
+
+def append_message(messages: List[Dict], message: Dict, limit: int = DEFAULT_HISTORY_LIMIT) -> List[Dict]:
+    """Ajoute le message et retire les plus anciens au-delà de limit; renvoie les messages retirés"""
+    messages.append(message)
+    overflow = len(messages) - limit
+    if overflow <= 0:
+        return []
+    evicted = messages[:overflow]
+    del messages[:overflow]
+    return evicted
+
+
+def summarize_evicted(topics: List[str], evicted: List[Dict]) -> List[str]:
+    """Met à jour le rappel des sujets retirés (questions tronquées, les plus récentes)"""
+    for message in evicted:
+        if message["role"] == "user":
+            text = message["text"].strip()
+            topics.append(text if len(text) <= TOPIC_LENGTH else text[:TOPIC_LENGTH].rstrip() + "…")
+    return topics[-SUMMARY_TOPICS:]
+
+
+def history_bytes(messages: List[Dict]) -> int:
+    """Taille approximative de l'historique d'une session (JSON UTF-8)"""
+    return len(json.dumps(messages, ensure_ascii=False).encode("utf-8"))
@@ -1,28 +1,301 @@
 import streamlit as st
 from openai import OpenAI
-import pandas as pd
-from langchain.vectorstores import Chroma
-from langchain.embeddings import OpenAIEmbeddings
-import os
+import atexit
+import html
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+from chat_history import (
+    DEFAULT_HISTORY_LIMIT,
+    append_message,
+    assistant_message,
+    summarize_evicted,
+    user_message
+)
+from context_builder import DEFAULT_CONTEXT_BUDGET, ContextBuilder
+from embedding_backends import EMBEDDING_CACHE_PATH, create_embeddings
+from lexical_index import LexicalIndex
+from medication_table import MEDICATION_TABLE_PATH, load_medication_table
+from medical_index import (
+    DEFAULT_EMBEDDING_BATCH_SIZE,
+    build_medical_documents,
+    file_checksum,
+    open_medical_index,
+    read_manifest
+)
+from response_cache import SemanticResponseCache
+from resilience import UpstreamUnavailable, configure_upstreams, get_upstream, upstream_stats
+from response_parser import SectionStreamParser, parse_response
+from response_renderer import render_history_sections, render_sections
+from settings import get_setting
+from styles import load_css
+from telemetry import configure_telemetry, record_span, register_collector, span
+from vector_index import NUMPY_INDEX_DIRECTORY, NumpyVectorIndex
 
 # Fix for SQLite version issue
 __import__('pysqlite3')
 import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 
+MEDICATIONS_CSV = "medicaments_propre.csv"
+PERSIST_DIRECTORY = "./medical_db"
+FALLBACK_MESSAGE = "Je suis désolé, je ne peux pas répondre pour le moment. 😔"
+UNAVAILABLE_MESSAGE = "Le service est momentanément surchargé, veuillez réessayer dans quelques instants."
+
+
+class MedicalEngine:
+    """Ressources lourdes partagées par toutes les sessions du processus:
+    clients OpenAI, table des médicaments et base vectorielle."""
+
+    warmups = 0  # Nombre de constructions du moteur dans ce processus
+
+    def __init__(self):
+        start = time.perf_counter()
+        configure_upstreams(dict(get_setting("UPSTREAMS", {})))
+        configure_telemetry(dict(get_setting("TELEMETRY", {})))
+        with span("startup") as attributes:
+            # Relances gérées par resilience (disjoncteur "openai_chat") plutôt que par le client
+            self.client = OpenAI(api_key=get_setting("OpenAI_key", required=True), max_retries=0)
+            # Backend configurable ("openai", "local" ou "hashing"), derrière un cache disque
+            with span("startup.embeddings"):
+                self.embeddings = create_embeddings(
+                    get_setting("EMBEDDING_BACKEND", "openai"),
+                    api_key=get_setting("OpenAI_key", required=True),
+                    cache_path=get_setting("EMBEDDING_CACHE_PATH", EMBEDDING_CACHE_PATH)
+                )
+            # Table Arrow projetée en mémoire (reconstruite si le CSV change) plutôt qu'un DataFrame
+            with span("startup.medication_table"):
+                self.medications = load_medication_table(
+                    MEDICATIONS_CSV,
+                    get_setting("MEDICATION_TABLE_PATH", MEDICATION_TABLE_PATH)
+                )
+            # Index lexical (noms, familles, indications) pour les recherches directes et hybrides
+            with span("startup.lexical_index"):
+                self.lexical_index = LexicalIndex(self.medications)
+            # Contexte du prompt borné en tokens (encodage tiktoken chargé une fois)
+            with span("startup.context_builder"):
+                self.context_builder = ContextBuilder(
+                    budget=int(get_setting("CONTEXT_TOKEN_BUDGET", DEFAULT_CONTEXT_BUDGET))
+                )
+            with span("startup.vectorstore") as vector_attributes:
+                self.vectorstore = self._create_or_load_vectorstore()
+                if get_setting("VECTOR_BACKEND", "chroma") == "numpy":
+                    self.vectorstore = self._load_numpy_index(self.vectorstore)
+                vector_attributes["backend"] = type(self.vectorstore).__name__
+            # Cache sémantique des réponses, partagé par toutes les sessions; désactivé tant
+            # que RESPONSE_CACHE_THRESHOLD n'est pas réglé (seuil non calibré)
+            with span("startup.response_cache"):
+                threshold = get_setting("RESPONSE_CACHE_THRESHOLD")
+                self.response_cache = SemanticResponseCache(
+                    threshold=float(threshold) if threshold not in (None, "") else None,
+                    ttl=float(get_setting("RESPONSE_CACHE_TTL", 86400)),
+                    max_entries=int(get_setting("RESPONSE_CACHE_SIZE", 512)),
+                    persist_path=get_setting("RESPONSE_CACHE_PATH") or None
+                )
+            atexit.register(self.response_cache.save)
+            MedicalEngine.warmups += 1
+            attributes["warmup"] = MedicalEngine.warmups
+        self._register_metrics()
+        self.startup_seconds = time.perf_counter() - start
+        self.started_at = time.time()
+        print(f"MedicalEngine prêt en {self.startup_seconds:.2f}s "
+              f"(construction n°{MedicalEngine.warmups} dans ce processus)")
+
+    def _register_metrics(self):
+        """Compteurs des caches et des services externes exportés par telemetry"""
+        caches = {"response": self.response_cache}
+        if hasattr(self.embeddings, "stats"):
+            caches["embedding"] = self.embeddings
+        register_collector("cache", lambda: {name: cache.stats() for name, cache in caches.items()}, key="engine")
+        register_collector("upstream", upstream_stats)
+
+    def stats(self) -> Dict:
+        """Métriques de démarrage du moteur partagé"""
+        return {
+            "startup_seconds": round(self.startup_seconds, 3),
+            "warmups": MedicalEngine.warmups,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "response_cache": self.response_cache.stats(),
+            "upstreams": upstream_stats()
+        }
+
+    def _create_or_load_vectorstore(self):
+        vectorstore, _ = open_medical_index(
+            PERSIST_DIRECTORY,
+            self.embeddings,
+            file_checksum(MEDICATIONS_CSV),
+            self._prepare_medical_documents,
+            batch_size=int(get_setting("EMBEDDING_BATCH_SIZE", DEFAULT_EMBEDDING_BATCH_SIZE))
+        )
+        return vectorstore
+
+    def _load_numpy_index(self, vectorstore):
+        # Index exact en mémoire, reconstruit depuis Chroma quand le manifeste a changé
+        stamp = read_manifest(PERSIST_DIRECTORY)
+        index = NumpyVectorIndex.load(NUMPY_INDEX_DIRECTORY, stamp)
+        if index is None:
+            index = NumpyVectorIndex.from_chroma(vectorstore, stamp)
+            index.save(NUMPY_INDEX_DIRECTORY)
+        return index
+
+    def _prepare_medical_documents(self):
+        return build_medical_documents(self.medications.to_frame())
+
+    def search_many(self, vectors: List[List[float]], k: int = 5) -> List[List[str]]:
+        """Recherche vectorielle de plusieurs requêtes en un seul appel: textes des k
+        documents les plus proches pour chaque vecteur"""
+        with span("vector_search", queries=len(vectors), k=k):
+            if isinstance(self.vectorstore, NumpyVectorIndex):
+                return [
+                    [doc.page_content for doc in docs]
+                    for docs in self.vectorstore.similarity_search_by_vectors(vectors, k)
+                ]
+            result = self.vectorstore._collection.query(
+                query_embeddings=[list(vector) for vector in vectors],
+                n_results=k,
+                include=["documents"]
+            )
+            return result["documents"]
+
+    def retrieve_many(self, queries: List[str], vectors: List[List[float]], k: int = 5) -> List[List[str]]:
+        """Textes des médicaments les plus pertinents pour chaque requête: recherche
+        vectorielle seule, ou hybride (fusion avec le score BM25) si HYBRID_SEARCH est activé
+        (désactivé par défaut: non mesuré par benchmark.py retrieval)"""
+        if not get_setting("HYBRID_SEARCH", False):
+            return self.search_many(vectors, k)
+        # Plus de candidats vectoriels, départagés par les correspondances lexicales
+        candidates = self.search_many(vectors, k * 4)
+        with span("lexical_fuse", queries=len(queries)):
+            return [self.lexical_index.fuse(contents, query, k=k) for query, contents in zip(queries, candidates)]
+
+    def build_messages(self, user_input: str, embedding: List[float]) -> List[Dict]:
+        # Candidats en surnombre: les génériques quasi identiques sont fusionnés par le builder
+        candidates = self.retrieve_many([user_input], [embedding], k=self.context_builder.max_documents * 2)[0]
+        return self.prompt_messages(user_input, candidates)
+
+    def prompt_messages(self, user_input: str, candidates: List[str]) -> List[Dict]:
+        """Messages envoyés au modèle: consignes et contexte borné en tokens"""
+        builder = self.context_builder
+        start = time.perf_counter()
+        context_body, context_tokens = builder.build(candidates)
+        duration = time.perf_counter() - start
+        context = "Médicaments disponibles pour ces symptômes:\n" + context_body
+        
+        system_prompt = """Tu es HealthBot, un assistant médical professionnel 👨‍⚕️.
+        
+        Pour chaque demande, fournis:
+        1. 💊 4-5 médicaments recommandés avec posologie, contre_indication, effet_indesirable. 
+            IMPORTANT: Utilise EXACTEMENT les noms des médicaments (med['titre']) avec (substance_active), Posologie indiquée, Contre-indications importantes, Effets indésirables possibles de la base de données fournie dans le contexte. 
+            NE PAS utiliser les noms génériques des substances actives.
+            Pour chaque médicament, indique:
+            - Le nom exact du médicament tel qu'il apparaît dans le contexte 
+            - Posologie indiquée (de la base de données)
+            - Contre-indications importantes
+            - Effets indésirables possibles
+
+         2. 🌿 4-5 remèdes naturels avec instructions
+        
+        Contexte des médicaments disponibles:
+        {context}
+        """
+        
+        messages = [
+            {"role": "system", "content": system_prompt.format(context=context)},
+            {"role": "user", "content": user_input}
+        ]
+        # Une seule ligne par requête dans le journal de telemetry: durée de construction
+        # du contexte, tokens du contexte (et budget) et du prompt complet
+        record_span(
+            "build_context", duration,
+            candidates=len(candidates),
+            tokens=context_tokens,
+            budget=builder.budget,
+            prompt_tokens=sum(builder.counter.count(message["content"]) for message in messages)
+        )
+        return messages
+
+    def complete(self, messages: List[Dict]) -> Dict[str, List[str]]:
+        """Appel du modèle (protégé par le disjoncteur "openai_chat") et découpage de la
+        réponse en sections; lève resilience.UpstreamUnavailable si OpenAI est indisponible"""
+        with span("llm", model="gpt-3.5-turbo") as attributes:
+            response = get_upstream("openai_chat").call(
+                lambda timeout: self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=800,
+                    timeout=timeout
+                )
+            )
+            if getattr(response, "usage", None) is not None:
+                attributes["completion_tokens"] = response.usage.completion_tokens
+        # Analyse en un seul passage de la réponse complète
+        with span("parse"):
+            return parse_response(response.choices[0].message.content)._asdict()
+
+
+_engine_lock = threading.Lock()
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+
+@st.cache_resource(show_spinner=False)
+def get_engine() -> MedicalEngine:
+    """Renvoie le moteur médical unique du processus (construit une seule fois)"""
+    with _engine_lock:
+        return MedicalEngine()
+
+
+def start_engine_warmup() -> threading.Thread:
+    """Lance une seule fois par processus le préchauffage du moteur en arrière-plan
+    (après un échec, la construction est retentée par la première session, pas ici)"""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=get_engine, name="medical-engine-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
 class MedicalChatbot:
     def __init__(self, language='fr'):
         self.language = language
         MedicalChatbot.initialize_session_state()
         
         try:
-            self.client = OpenAI(api_key=st.secrets["OpenAI_key"])
-            self.embeddings = OpenAIEmbeddings(openai_api_key=st.secrets["OpenAI_key"])
-            self.medications = pd.read_csv("medicaments_propre.csv")
-            self.vectorstore = self._create_or_load_vectorstore()
+            self.engine = get_engine()
         except Exception as e:
+            self.engine = None
             st.error(f"Initialization error: {str(e)}")
 
+    @property
+    def client(self):
+        return self.engine.client
+
+    @property
+    def embeddings(self):
+        return self.engine.embeddings
+
+    @property
+    def medications(self):
+        return self.engine.medications
+
+    @property
+    def vectorstore(self):
+        return self.engine.vectorstore
+
+    @property
+    def context_builder(self):
+        return self.engine.context_builder
+
+    @property
+    def lexical_index(self):
+        return self.engine.lexical_index
+
+    @property
+    def response_cache(self):
+        return self.engine.response_cache
+
     @staticmethod
     def initialize_session_state():
         if "messages" not in st.session_state:
@@ -31,211 +304,229 @@ class MedicalChatbot:
                 'en': "Hello! 👋 I'm HealthBot. How can I help you?",
                 'ru': "Здравствуйте! 👋 Я HealthBot. Как я могу вам помочь?"
             }
-            st.session_state.messages = [
-                {
-                    "role": "system",
-                    "content": "Tu es HealthBot, assistant médical professionnel 👨⚕️"
-                },
-                {
-                    "role": "assistant",
-                    "content": initial_messages['fr']
-                }
-            ]
+            # Historique borné de messages structurés (texte ou sections), sans HTML
+            st.session_state.messages = [assistant_message(text=initial_messages['fr'])]
+            st.session_state.history_topics = []
 
-    def _create_or_load_vectorstore(self):
-        persist_directory = "./medical_db"
-        if not os.path.exists(persist_directory):
-            os.makedirs(persist_directory)
-            
-        try:
-            vectorstore = Chroma(
-                persist_directory=persist_directory,
-                embedding_function=self.embeddings.embed_query
-            )
-            vectorstore.similarity_search("test", k=1)
-            return vectorstore
-        except Exception:
-            documents = self._prepare_medical_documents()
-            vectorstore = Chroma.from_texts(
-                texts=[doc["content"] for doc in documents],
-                metadatas=[doc["metadata"] for doc in documents],
-                embedding=self.embeddings,
-                persist_directory=persist_directory
-            )
-            vectorstore.persist()
-            return vectorstore
+    def _build_messages(self, user_input: str, embedding_response: List[float]) -> List[Dict]:
+        return self.engine.build_messages(user_input, embedding_response)
 
-    def _prepare_medical_documents(self):
-        documents = []
-        for _, med in self.medications.iterrows():
+    def _render_html(self, medications: List[str], remedies: List[str], precautions: List[str]) -> str:
+        return render_sections(medications, remedies, precautions)
+
+    def _direct_answer(self, user_input: str) -> Optional[Dict[str, List[str]]]:
+        """Réponse tirée directement de la base quand la question ne porte que sur la
+        fiche d'un médicament ("ABUFÈNE posologie"), sans embedding ni appel au modèle.
+        Désactivée par défaut (DIRECT_LOOKUP); les fiches étant en français, les autres
+        langues passent toujours par le modèle"""
+        if not get_setting("DIRECT_LOOKUP", False) or self.language != "fr":
+            return None
+        # Interactions, patient, âge ou symptôme: la question relève du modèle
+        rows = self.lexical_index.direct_lookup(user_input)
+        if not rows:
+            return None
+
+        def excerpt(text: str, limit: int = 400) -> str:
+            text = html.escape(text)
+            return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+        medications, precautions = [], []
+        for row in rows[:3]:
+            med = self.medications.row(row)
+            name = html.escape(med["titre"])
+            # Seule l'indication est abrégée: posologie et précautions sont reprises en entier
+            medications.append(f"<strong>{name}</strong> ({html.escape(med['famille_medicament'])}): {excerpt(med['cas_utilisation'])}")
+            if med["posologie"]:
+                medications.append(f"Posologie: {html.escape(med['posologie'])}")
+            if med["contre_indication"]:
+                precautions.append(f"{name} - Contre-indications: {html.escape(med['contre_indication'])}")
+            if med["effet_indesirable"]:
+                precautions.append(f"{name} - Effets indésirables: {html.escape(med['effet_indesirable'])}")
+            if med["grossesse_allaitement_fertilite"]:
+                precautions.append(f"{name} - Grossesse et allaitement: {html.escape(med['grossesse_allaitement_fertilite'])}")
+        remedies = ["Réponse tirée de la fiche du médicament: décrivez vos symptômes pour obtenir des remèdes naturels."]
+        return {"medications": medications, "remedies": remedies, "precautions": precautions}
+
+    def get_response(self, user_input: str) -> str:
+        with span("get_response"):
+            sections = self.get_sections(user_input)
+            if sections is None:
+                return FALLBACK_MESSAGE
+            with span("render"):
+                return self._render_html(**sections)
+
+    def _lookup(self, user_input: str, attributes: Dict):
+        """Étapes communes aux réponses complètes et en streaming: réponse directe,
+        embedding de la question et cache sémantique. Renvoie (sections, embedding);
+        attributes["path"] indique la source de la réponse ("direct", "cache")"""
+        with span("direct_lookup"):
+            direct = self._direct_answer(user_input)
+        if direct is not None:
+            attributes["path"] = "direct"
+            return direct, None
+        with span("embed_query"):
+            embedding = self.embeddings.embed_query(user_input)
+        with span("cache_lookup") as cache_attributes:
+            cached = self.response_cache.lookup(embedding, self.language)
+            cache_attributes["hit"] = cached is not None
+        if cached is not None:
+            attributes["path"] = "cache"
+        return cached, embedding
+
+    def get_sections(self, user_input: str) -> Optional[Dict[str, List[str]]]:
+        """Réponse structurée (médicaments, remèdes, précautions), ou None en cas d'erreur"""
+        with span("get_sections") as attributes:
             try:
-                content = f"Médicament: {med['titre']}\n"
-                metadata = {
-                    "name": med['titre'],
-                    "category": med.get('categorie', ''),
-                    "symptoms": med.get('symptomes', ''),
-                    "posologie": med.get('posologie', ''),
-                    "contre_indication": med.get('contre_indication', ''),
-                    "grossesse_allaitement": med.get('grossesse_allaitement_fertilite', ''),
-                    "effet_indesirable": med.get('effet_indesirable', '')
-                }
-                
-                content += "\n".join([
-                    f"Catégorie: {metadata['category']}",
-                    f"Symptômes: {metadata['symptoms']}",
-                    f"Posologie: {metadata['posologie']}",
-                    f"Contre-indications: {metadata['contre_indication']}"
-                ])
-                
-                documents.append({
-                    "content": content,
-                    "metadata": metadata
-                })
+                sections, embedding = self._lookup(user_input, attributes)
+                if sections is not None:
+                    return sections
+
+                messages = self._build_messages(user_input, embedding)
+                # OpenAI en panne ou saturé: message d'attente plutôt que la réponse d'une
+                # autre question (le cache a déjà été consulté au seuil normal)
+                sections = self.engine.complete(messages)
+                # Une réponse vide (non analysable) n'est pas servie aux questions voisines
+                if any(sections.values()):
+                    self.response_cache.store(embedding, self.language, sections)
+                attributes["path"] = "llm"
+                return sections
+
+            except UpstreamUnavailable as e:
+                attributes["path"] = "unavailable"
+                print(f"Service indisponible: {str(e)}")
+                st.warning(UNAVAILABLE_MESSAGE)
+                return None
             except Exception as e:
-                st.warning(f"Erreur document: {med['titre']}: {str(e)}")
-        return documents
+                attributes["path"] = "error"
+                error_message = f"Désolé, une erreur s'est produite: {str(e)}"
+                st.error(error_message)
+                return None
+
+    def stream_response(self, user_input: str) -> Iterator[Dict[str, List[str]]]:
+        """Génère l'état des sections au fur et à mesure des fragments reçus du modèle"""
+        sections, embedding = self._lookup(user_input, {})
+        if sections is not None:
+            yield sections
+            return
+
+        messages = self._build_messages(user_input, embedding)
+        start = time.perf_counter()
+        first_token = None
 
-    def get_response(self, user_input: str) -> str:
         try:
-            embedding_response = self.embeddings.embed_query(user_input)
-            
-            similar_meds = self.vectorstore.similarity_search_by_vector(
-                embedding_response,
-                k=5
-            )
-            
-            context = "Médicaments disponibles pour ces symptômes:\n"
-            for med in similar_meds:
-                context += f"\n---\n{med.page_content}\n"
-            
-            system_prompt = """Tu es HealthBot, un assistant médical professionnel 👨‍⚕️.
-            
-            Pour chaque demande, fournis:
-            1. 💊 4-5 médicaments recommandés avec posologie, contre_indication, effet_indesirable. 
-                IMPORTANT: Utilise EXACTEMENT les noms des médicaments (med['titre']) avec (substance_active), Posologie indiquée, Contre-indications importantes, Effets indésirables possibles de la base de données fournie dans le contexte. 
-                NE PAS utiliser les noms génériques des substances actives.
-                Pour chaque médicament, indique:
-                - Le nom exact du médicament tel qu'il apparaît dans le contexte 
-                - Posologie indiquée (de la base de données)
-                - Contre-indications importantes
-                - Effets indésirables possibles
-
-             2. 🌿 4-5 remèdes naturels avec instructions
-            
-            Contexte des médicaments disponibles:
-            {context}
-            """
-            
-            messages = [
-                {"role": "system", "content": system_prompt.format(context=context)},
-                {"role": "user", "content": user_input}
-            ]
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=800
+            # La place "openai_chat" et le disjoncteur couvrent toute la génération
+            stream = get_upstream("openai_chat").stream(
+                lambda timeout: self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=800,
+                    stream=True,
+                    timeout=timeout
+                )
             )
-            
-            response_content = response.choices[0].message.content
-            medications = []
-            remedies = []
-            precautions = []
-
-            # Extraction des médicaments
-            parts = response_content.split("💊")
-            if len(parts) > 1:
-                medications_part = parts[1].split("🌿")[0] if "🌿" in parts[1] else parts[1]
-                medications = [med.strip() for med in medications_part.strip().split("\n") if med.strip()]
-            
-            # Extraction des remèdes naturels
-            parts = response_content.split("🌿")
-            if len(parts) > 1:
-                remedies_part = parts[1].split("⚠️")[0] if "⚠️" in parts[1] else parts[1]
-                remedies = [rem.strip() for rem in remedies_part.strip().split("\n") if rem.strip()]
-            
-            # Extraction des précautions
-            parts = response_content.split("⚠️")
-            if len(parts) > 1:
-                precautions = [prec.strip() for prec in parts[1].strip().split("\n") if prec.strip()]
-
-            # Construction de la réponse HTML
-            html_response = """
-            <div style="display: flex; flex-direction: column; gap: 20px;">
-                <div style="display: flex; gap: 20px; flex-wrap: wrap;">
-                    <div style="flex: 1; min-width: 300px; background-color: rgba(47, 53, 66, 0.8); padding: 15px; border-radius: 8px; color: white; margin-bottom: 10px;">
-                        <h3 style="color: #2196f3;">💊 Médicaments recommandés</h3>
-                        <ul style="list-style-type: none; padding-left: 0;">
-            """
-            
-            for med in medications:
-                if med.strip():
-                    html_response += f'<li style="margin-bottom: 10px; padding-left: 20px; position: relative;">{med}</li>'
-            
-            html_response += """
-                        </ul>
-                    </div>
-                    <div style="flex: 1; min-width: 300px; background-color: rgba(47, 53, 66, 0.8); padding: 15px; border-radius: 8px; color: white; margin-bottom: 10px;">
-                        <h3 style="color: #4caf50;">🌿 Remèdes naturels</h3>
-                        <ul style="list-style-type: none; padding-left: 0;">
-            """
-            
-            for remedy in remedies:
-                if remedy.strip():
-                    html_response += f'<li style="margin-bottom: 10px; padding-left: 20px; position: relative;">{remedy}</li>'
-            
-            html_response += """
-                        </ul>
-                    </div>
-                </div>
-            """
-            
-            if precautions:
-                html_response += """
-                <div style="background-color: rgba(255, 152, 0, 0.2); padding: 15px; border-radius: 8px; color: white; margin-bottom: 10px;">
-                    <h3 style="color: #ff9800;">⚠️ Précautions</h3>
-                    <ul style="list-style-type: none; padding-left: 0;">
-                """
-                
-                for precaution in precautions:
-                    if precaution.strip():
-                        html_response += f'<li style="margin-bottom: 10px; padding-left: 20px; position: relative;">{precaution}</li>'
-                
-                html_response += """
-                    </ul>
-                </div>
-                """
-            
-            html_response += """
-            </div>
-            """
-            
-            return html_response
+        except UpstreamUnavailable:
+            record_span("llm", time.perf_counter() - start, status="error", streaming=True)
+            raise
 
-        except Exception as e:
-            error_message = f"Désolé, une erreur s'est produite: {str(e)}"
-            st.error(error_message)
-            return "Je suis désolé, je ne peux pas répondre pour le moment. 😔"
+        parser = SectionStreamParser()
+        finish_reason = None
+        with stream:
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].finish_reason:
+                        finish_reason = chunk.choices[0].finish_reason
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    parser.feed(delta)
+                    yield parser.snapshot()
+            except Exception:
+                record_span("llm", time.perf_counter() - start, status="error", streaming=True)
+                raise
+
+        parser.close()
+        sections = parser.snapshot()
+        # Seul un flux terminé normalement ("stop") est mis en cache: une réponse coupée
+        # (limite de tokens, connexion interrompue) ou vide serait resservie pendant le TTL
+        if finish_reason == "stop" and any(sections.values()):
+            self.response_cache.store(embedding, self.language, sections)
+        yield sections
+        # Étapes mesurées à la main: le flux est consommé entre deux rendus de l'interface
+        total = time.perf_counter() - start
+        record_span("llm.first_token", first_token or total, streaming=True)
+        record_span("llm", total, streaming=True)
+
+    def _display_streamed_response(self, prompt: str) -> Dict[str, List[str]]:
+        placeholder = st.empty()
+        placeholder.markdown("Analyse en cours... ⏳")
+        last_render = 0.0
+        render_seconds, renders = 0.0, 0
+        for sections in self.stream_response(prompt):
+            # Limite le nombre de rendus pendant le streaming (~20 par seconde)
+            now = time.perf_counter()
+            if now - last_render < 0.05 or not any(sections.values()):
+                continue
+            last_render = now
+            placeholder.markdown(self._render_html(**sections), unsafe_allow_html=True)
+            render_seconds += time.perf_counter() - now
+            renders += 1
+        now = time.perf_counter()
+        placeholder.markdown(self._render_html(**sections), unsafe_allow_html=True)
+        record_span("render", render_seconds + time.perf_counter() - now, renders=renders + 1)
+        return sections
+
+    @staticmethod
+    def _render_message(message: Dict) -> str:
+        sections = message.get("sections")
+        if sections is None:
+            return message["text"]
+        return render_history_sections(
+            tuple(sections["medications"]), tuple(sections["remedies"]), tuple(sections["precautions"])
+        )
+
+    def _remember(self, message: Dict):
+        limit = int(get_setting("CHAT_HISTORY_LIMIT", DEFAULT_HISTORY_LIMIT))
+        evicted = append_message(st.session_state.messages, message, limit)
+        if evicted:
+            st.session_state.history_topics = summarize_evicted(st.session_state.history_topics, evicted)
 
     def display(self):
         try:
             with st.container():
+                if st.session_state.history_topics:
+                    st.caption("Sujets précédents: " + " · ".join(st.session_state.history_topics))
                 for message in st.session_state.messages:
-                    if message["role"] != "system":
-                        with st.chat_message(message["role"]):
-                            st.markdown(message["content"], unsafe_allow_html=True)
+                    with st.chat_message(message["role"]):
+                        st.markdown(self._render_message(message), unsafe_allow_html=message["role"] == "assistant")
 
                 if prompt := st.chat_input("Décrivez vos symptômes..."):
-                    st.session_state.messages.append({"role": "user", "content": prompt})
+                    self._remember(user_message(prompt))
                     with st.chat_message("user"):
                         st.markdown(prompt)
 
-                    with st.chat_message("assistant"):
-                        with st.spinner("Analyse en cours..."):
-                            response = self.get_response(prompt)
-                            st.markdown(response, unsafe_allow_html=True)
-                            st.session_state.messages.append({"role": "assistant", "content": response})
+                    streaming = get_setting("STREAM_RESPONSES", True)
+                    with st.chat_message("assistant"), span("chat_turn", streaming=streaming):
+                        sections = None
+                        if streaming:
+                            try:
+                                sections = self._display_streamed_response(prompt)
+                            except UpstreamUnavailable as e:
+                                print(f"Service indisponible: {str(e)}")
+                                st.warning(UNAVAILABLE_MESSAGE)
+                            except Exception as e:
+                                st.error(f"Désolé, une erreur s'est produite: {str(e)}")
+                        else:
+                            with st.spinner("Analyse en cours..."):
+                                sections = self.get_sections(prompt)
+                                if sections is not None:
+                                    with span("render"):
+                                        st.markdown(self._render_html(**sections), unsafe_allow_html=True)
+                        if sections is None:
+                            st.markdown(FALLBACK_MESSAGE)
+                        self._remember(assistant_message(sections, FALLBACK_MESSAGE))
                         
         except Exception as e:
             st.error(f"Erreur d'affichage du chat: {str(e)}")
@@ -247,6 +538,7 @@ def main():
         layout="wide"
     )
     
+    st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
     st.title("Assistant Médical HealthBot 👨‍⚕️")
     
     chatbot = MedicalChatbot()
@@ -0,0 +1,130 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Règles par défaut, communes à toutes les langues. Les articles recommandés
+# (thèmes santé de sites de confiance) gardent la liste d'origine; la recherche
+# d'actualités de la barre latérale y ajoute les règles news_*. Les termes et les
+# domaines sont des sous-chaînes, comme dans les boucles d'origine: "shop" exclut
+# aussi "Shopping list" et "pharmacy." exclut walgreenspharmacy.com.
+DEFAULT_FILTER_RULES = {
+    "excluded_terms": ['amazon', 'boutique', 'shop', 'achat', 'prix', 'магазин', 'купить', 'аптека'],
+    "news_excluded_terms": [
+        'buy', 'order', 'purchase', 'discount', 'deal', 'offer', 'promo', 'sale',
+        'заказать', 'скидка', 'акция', 'распродажа', 'цена', 'стоимость'
+    ],
+    # Cherchés dans le lien entier
+    "news_blocked_domains": ['amazon.', 'ebay.', 'pharmacy.', 'apteka.'],
+    # Sources de confiance: le domaine et tous ses sous-domaines
+    "trusted_domains": [
+        'doctissimo.fr', 'passeportsante.net', 'santemagazine.fr',
+        'psychologies.com', 'yogajournal.fr', 'healthline.com',
+        'webmd.com', 'medicalnewstoday.com', 'mindful.org',
+        'health-diet.ru', 'medportal.ru', 'takzdorovo.ru'
+    ]
+}
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """Expression régulière en forme d'arbre de préfixes ("a(?:chat|mazon)|b(?:outique|uy)"):
+    un seul passage sur le texte, quel que soit le nombre de termes"""
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Un terme se termine ici mais d'autres le prolongent: la suite est facultative
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+
+def hostname(url: str) -> str:
+    """Nom d'hôte en minuscules, sans le préfixe www. (analyse minimale, plus rapide
+    que urllib.parse pour les URL http(s) renvoyées par Serper)"""
+    url = url.lower()
+    start = url.find("//")
+    start = start + 2 if start >= 0 else 0
+    end = len(url)
+    for separator in "/?#":
+        position = url.find(separator, start, end)
+        if position >= 0:
+            end = position
+    host = url[start:end].rpartition("@")[2].partition(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+class ContentFilter:
+    """Filtre des résultats de recherche construit une seule fois: une expression
+    régulière combinée pour les termes exclus, une autre pour les domaines bloqués,
+    et une recherche dans un ensemble pour les domaines de confiance"""
+
+    def __init__(self, excluded_terms: Iterable[str] = (), blocked_domains: Iterable[str] = (),
+                 trusted_domains: Iterable[str] = ()):
+        terms = {term.lower() for term in excluded_terms if term}
+        self._terms_re = re.compile(_trie_pattern(terms)) if terms else None
+        domains = {domain.lower() for domain in blocked_domains if domain}
+        self._domains_re = re.compile(_trie_pattern(domains)) if domains else None
+        self.trusted_domains = frozenset(domain.lower() for domain in trusted_domains)
+
+    @classmethod
+    def from_rules(cls, rules: Optional[Dict] = None, news: bool = False) -> "ContentFilter":
+        """Construit le filtre à partir des règles par défaut, surchargées par rules
+        (news: règles de la recherche d'actualités, plus strictes)"""
+        merged = dict(DEFAULT_FILTER_RULES)
+        merged.update(rules or {})
+        terms = list(merged["excluded_terms"])
+        domains = []
+        if news:
+            terms += merged["news_excluded_terms"]
+            domains = merged["news_blocked_domains"]
+        return cls(terms, domains, merged["trusted_domains"])
+
+    def has_excluded_term(self, *texts: str) -> bool:
+        """Vrai si l'un des textes contient un terme exclu, n'importe où"""
+        if self._terms_re is None:
+            return False
+        return self._terms_re.search("\n".join(t for t in texts if t).lower()) is not None
+
+    def is_blocked_domain(self, url: str) -> bool:
+        return self._domains_re is not None and self._domains_re.search(url.lower()) is not None
+
+    def is_trusted(self, url: str) -> bool:
+        labels = hostname(url).split(".")
+        # www.sante.doctissimo.fr -> sante.doctissimo.fr, doctissimo.fr, fr
+        return any(".".join(labels[i:]) in self.trusted_domains for i in range(len(labels)))
+
+    def filter_results(self, items: List[Dict], fields: Iterable[str] = ("title", "link")) -> List[Dict]:
+        """Ne garde que les résultats Serper sans terme commercial ni domaine bloqué"""
+        fields = tuple(fields)
+        return [
+            item for item in items
+            if not self.has_excluded_term(*(item.get(field, '') for field in fields))
+            and not self.is_blocked_domain(item.get('link', ''))
+        ]
+
+
+def _rules_key(rules: Optional[Dict]) -> Tuple:
+    """Clé hashable des règles (valeurs: listes de chaînes)"""
+    return tuple(sorted((name, tuple(values)) for name, values in (rules or {}).items()))
+
+
+_filters: Dict[Tuple, ContentFilter] = {}
+_filters_lock = threading.Lock()
+
+
+def get_content_filter(rules: Optional[Dict] = None, news: bool = False) -> ContentFilter:
+    """Filtre partagé par le processus pour ces règles (un pour les articles, un pour
+    les actualités), compilé au premier appel"""
+    key = (news, _rules_key(rules))
+    with _filters_lock:
+        if key not in _filters:
+            _filters[key] = ContentFilter.from_rules(rules, news)
+        return _filters[key]
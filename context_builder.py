@@ -0,0 +1,124 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from embedding_backends import fold_accents
+from medical_index import DOCUMENT_SCHEMA
+
+# Budget de tokens par défaut pour le contexte des médicaments
+DEFAULT_CONTEXT_BUDGET = 1200
+DEFAULT_MAX_DOCUMENTS = 5
+
+# Plafond de tokens par champ, dans l'ordre de priorité: un champ n'est ajouté que
+# s'il reste du budget après les précédents, et il est tronqué à son plafond
+FIELD_LIMITS = [
+    ("Médicament", 40),
+    ("Indications", 120),
+    ("Posologie", 120),
+    ("Contre-indications", 100),
+    ("Catégorie", 20)
+]
+
+# Similarité (Jaccard des mots) au-delà de laquelle deux fiches sont fusionnées
+DUPLICATE_SIMILARITY = 0.9
+
+_LABELS = [label for _, _, label in DOCUMENT_SCHEMA if label is not None]
+_FIELD_RE = re.compile(r"^(" + "|".join(re.escape(label) for label in _LABELS) + r"): ?", re.MULTILINE)
+_WORD_RE = re.compile(r"\w+")
+
+
+class TokenCounter:
+    """Comptage et troncature en tokens avec tiktoken; sans le fichier d'encodage
+    (premier lancement hors ligne), approximation à 4 caractères par token"""
+
+    def __init__(self, model: str = "gpt-3.5-turbo"):
+        try:
+            import tiktoken
+            self.encoding = tiktoken.encoding_for_model(model)
+        except Exception as e:
+            print(f"tiktoken indisponible, comptage approximatif des tokens: {str(e)}")
+            self.encoding = None
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return (len(text) + 3) // 4
+        return len(self.encoding.encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Texte coupé à max_tokens (à la fin d'un mot), suivi de "…" s'il a été raccourci"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is None:
+            if len(text) <= max_tokens * 4:
+                return text
+            cut = text[:max_tokens * 4]
+        else:
+            tokens = self.encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            cut = self.encoding.decode(tokens[:max_tokens])
+        return cut.rsplit(" ", 1)[0].rstrip(" ,;:") + "…"
+
+
+def parse_fields(content: str) -> Dict[str, str]:
+    """Champs d'un document vectorisé ("Libellé: valeur" par ligne, cf. DOCUMENT_SCHEMA)"""
+    parts = _FIELD_RE.split(content)
+    return {label: value.strip() for label, value in zip(parts[1::2], parts[2::2])}
+
+
+def _words(fields: Dict[str, str]) -> set:
+    text = " ".join(value for label, value in fields.items() if label != "Médicament")
+    return set(_WORD_RE.findall(fold_accents(text)))
+
+
+class ContextBuilder:
+    """Contexte du prompt limité en tokens: fusion des fiches quasi identiques
+    (génériques d'une même molécule), puis champs ajoutés par priorité et tronqués"""
+
+    def __init__(self, budget: int = DEFAULT_CONTEXT_BUDGET, max_documents: int = DEFAULT_MAX_DOCUMENTS,
+                 counter: Optional[TokenCounter] = None):
+        self.budget = budget
+        self.max_documents = max_documents
+        self.counter = counter or TokenCounter()
+
+    def deduplicate(self, contents: Sequence[str]) -> List[Dict[str, str]]:
+        """Fiches distinctes dans l'ordre de pertinence; les noms des doublons sont regroupés"""
+        entries: List[Tuple[Dict[str, str], set]] = []
+        for content in contents:
+            fields = parse_fields(content)
+            words = _words(fields)
+            for kept, kept_words in entries:
+                union = len(words | kept_words)
+                if union and len(words & kept_words) / union >= DUPLICATE_SIMILARITY:
+                    name = fields.get("Médicament", "")
+                    if name and name not in kept["Médicament"].split(" / "):
+                        kept["Médicament"] += " / " + name
+                    break
+            else:
+                entries.append((fields, words))
+        return [fields for fields, _ in entries[:self.max_documents]]
+
+    def build(self, contents: Sequence[str]) -> Tuple[str, int]:
+        """Contexte prêt à insérer dans le prompt et son nombre de tokens"""
+        entries = self.deduplicate(contents)
+        remaining = self.budget
+        blocks = []
+        for rank, fields in enumerate(entries):
+            # Part équitable du budget restant; ce qui n'est pas utilisé profite aux suivants
+            share = remaining // (len(entries) - rank)
+            lines, used = [], self.counter.count("\n---\n\n")
+            for label, limit in FIELD_LIMITS:
+                value = fields.get(label)
+                if not value:
+                    continue
+                prefix = f"{label}: "
+                available = min(limit, share - used - self.counter.count(prefix))
+                if available <= 0:
+                    break
+                value = self.counter.truncate(value, available)
+                lines.append(prefix + value)
+                used += self.counter.count(lines[-1]) + 1
+            if lines:
+                blocks.append("\n---\n" + "\n".join(lines) + "\n")
+                remaining -= self.counter.count(blocks[-1])
+        context = "".join(blocks)
+        return context, self.counter.count(context)
@@ -0,0 +1,215 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from resilience import get_upstream
+
+EMBEDDING_CACHE_PATH = "./embedding_cache.sqlite"
+DEFAULT_LOCAL_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold_accents(text: str) -> str:
+    """Minuscules sans accents ("Fièvre" -> "fievre")"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+class HashingEmbeddings:
+    """Embeddings hors ligne et déterministes (hachage de mots et de trigrammes).
+    Qualité sémantique limitée: sert aux tests, aux benchmarks et au mode dégradé."""
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+        self.model = f"hashing-{dimensions}"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in _TOKEN_RE.findall(fold_accents(text)):
+            padded = f" {token} "
+            features = [token] + [padded[i:i + 3] for i in range(len(padded) - 2)]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+                vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class LocalEmbeddings:
+    """Modèle d'embedding local exécuté sur CPU (sentence-transformers, optionnel)"""
+
+    def __init__(self, model_name: str = DEFAULT_LOCAL_MODEL):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "Le backend 'local' nécessite le paquet sentence-transformers "
+                "(pip install sentence-transformers)"
+            ) from e
+        self.model = model_name
+        self._encoder = SentenceTransformer(model_name, device="cpu")
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            vectors = self._encoder.encode(texts, batch_size=64, normalize_embeddings=True)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class CachedEmbeddings:
+    """Cache persistant adressé par contenu (empreinte du texte -> vecteur) devant
+    n'importe quel backend: un même texte n'est jamais vectorisé deux fois"""
+
+    _BATCH = 500  # Limite du nombre de paramètres par requête SQLite
+
+    def __init__(self, backend, path: str = EMBEDDING_CACHE_PATH):
+        self.backend = backend
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @property
+    def model(self) -> str:
+        return str(getattr(self.backend, "model", type(self.backend).__name__))
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self._BATCH):
+                batch = keys[i:i + self._BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(list(set(keys)))
+
+        # Un seul appel au backend pour tous les textes absents du cache (sans doublons)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.backend.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed)
+            found.update(computed)
+
+        self._count(len(texts) - len(missing), len(missing))
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        found = self._lookup([key])
+        if key in found:
+            self._count(1, 0)
+            return found[key]
+        self._count(0, 1)
+        vector = self.backend.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    def _count(self, hits: int, misses: int):
+        # Vectorisations lancées depuis plusieurs threads (chargement, sessions)
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 3) if total else 0.0
+        }
+
+
+class GuardedEmbeddings:
+    """Appels d'un backend distant passés par la protection resilience (disjoncteur,
+    concurrence bornée, relances): placé sous le cache, les textes déjà connus restent
+    servis même quand le service est en panne"""
+
+    def __init__(self, backend, upstream: str = "openai_embeddings"):
+        self.backend = backend
+        self.upstream = upstream
+
+    @property
+    def model(self) -> str:
+        return str(getattr(self.backend, "model", type(self.backend).__name__))
+
+    def _with_timeout(self, timeout: float):
+        """Backend dont chaque requête est bornée par le temps restant de la tentative.
+        OpenAIEmbeddings (openai>=1) transmet model_kwargs à embeddings.create, qui
+        accepte timeout; sans cela le client attendrait jusqu'à 600 s."""
+        model_kwargs = getattr(self.backend, "model_kwargs", None)
+        if model_kwargs is None:
+            return self.backend
+        copy = getattr(self.backend, "model_copy", None) or self.backend.copy
+        return copy(update={"model_kwargs": dict(model_kwargs, timeout=timeout)})
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return get_upstream(self.upstream).call(lambda timeout: self._with_timeout(timeout).embed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return get_upstream(self.upstream).call(lambda timeout: self._with_timeout(timeout).embed_query(text))
+
+
+def create_embeddings(backend: str = "openai", api_key: Optional[str] = None,
+                      cache_path: Optional[str] = EMBEDDING_CACHE_PATH, **options):
+    """Instancie le backend d'embedding demandé, derrière le cache disque si cache_path est défini"""
+    if backend == "openai":
+        from langchain.embeddings import OpenAIEmbeddings
+        # Relances gérées par resilience plutôt que par le client
+        options.setdefault("max_retries", 0)
+        embeddings = GuardedEmbeddings(OpenAIEmbeddings(openai_api_key=api_key, **options))
+    elif backend == "local":
+        embeddings = LocalEmbeddings(**options)
+    elif backend == "hashing":
+        embeddings = HashingEmbeddings(**options)
+    else:
+        raise ValueError(f"Backend d'embedding inconnu: {backend}")
+
+    if cache_path:
+        embeddings = CachedEmbeddings(embeddings, cache_path)
+    return embeddings
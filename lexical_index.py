@@ -0,0 +1,172 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from embedding_backends import fold_accents
+from medical_index import document_content
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Mots vides ignorés par le score BM25 (après suppression des accents)
+STOPWORDS = frozenset("""
+a ai au aux avec ce ces dans de des du elle en est et il j je la le les leur ma mais me mes
+mon ne nous on ou par pas pour qu que qui sa se ses son suis sur ta te tes ton tu un une vous
+y the and of or to in for with my is have
+""".split())
+
+# Seuls mots tolérés autour du nom d'un médicament pour une réponse directe tirée de la
+# fiche (après suppression des accents): champs de la fiche et formules interrogatives.
+# Tout autre mot (second médicament, patient, âge, symptôme) relève du modèle.
+DIRECT_LOOKUP_KEYWORDS = frozenset("""
+posologie dose doses dosage effet effets indesirable indesirables secondaire secondaires
+contre indication indications contreindication contreindications grossesse allaitement notice
+quel quels quelle quelles sont side effects contraindications pregnancy breastfeeding what are
+""".split())
+
+# Colonnes indexées (colonne de medicaments_propre.csv -> poids dans le score BM25)
+FIELD_WEIGHTS = {
+    "titre": 3.0,
+    "famille_medicament": 1.5,
+    "cas_utilisation": 1.0
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Mots en minuscules sans accents ("ABUFÈNE posologie" -> ["abufene", "posologie"])"""
+    return _TOKEN_RE.findall(fold_accents(text))
+
+
+def terms(text: str) -> List[str]:
+    """Mots significatifs pour BM25 (sans mots vides ni lettres isolées)"""
+    return [word for word in tokenize(text) if len(word) > 1 and word not in STOPWORDS]
+
+
+def trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LexicalIndex:
+    """Index lexical des médicaments construit une fois à partir de la table:
+    noms exacts et approchés (trigrammes) pour les recherches directes, et score
+    BM25 pondéré par champ (nom, famille, indications) pour la recherche hybride.
+    Seuls les index sont conservés; les textes restent dans la table (MedicationTable)."""
+
+    def __init__(self, table, k1: float = 1.2, b: float = 0.75, min_name_length: int = 5):
+        self.table = table
+        self._size = len(table)
+        columns = {column: table.column(column) for column in FIELD_WEIGHTS}
+        self._build_names(columns, min_name_length)
+        self._build_bm25(columns, k1, b)
+
+    def _build_names(self, columns: Dict[str, List[str]], min_name_length: int):
+        # Titre complet et premier mot du titre -> lignes
+        self._titles: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+        self._first_words: Dict[str, List[int]] = defaultdict(list)
+        symptom_frequency = Counter()
+        for text in columns["cas_utilisation"]:
+            symptom_frequency.update(set(tokenize(text or "")))
+        # Un premier mot courant dans les indications ("calcium", "acide") n'identifie pas un médicament
+        generic = {word for word, count in symptom_frequency.items() if count >= self._size * 0.01}
+        for i, name in enumerate(columns["titre"]):
+            words = tuple(tokenize(name or ""))
+            if not words:
+                continue
+            self._titles[words].append(i)
+            if len(words[0]) >= min_name_length and words[0] not in generic:
+                self._first_words[words[0]].append(i)
+        self._max_title_words = max((len(words) for words in self._titles), default=0)
+        self._trigrams: Dict[str, List[str]] = defaultdict(list)
+        for word in self._first_words:
+            for gram in trigrams(word):
+                self._trigrams[gram].append(word)
+
+    def _build_bm25(self, columns: Dict[str, List[str]], k1: float, b: float):
+        # Poids BM25 précalculés par (terme, document): une requête n'est qu'une somme de vecteurs creux
+        weights: Dict[str, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+        n = self._size
+        for field, field_weight in FIELD_WEIGHTS.items():
+            counts = [Counter(terms(text or "")) for text in columns[field]]
+            lengths = np.array([sum(c.values()) for c in counts], dtype=np.float64)
+            average = lengths.mean() if n and lengths.mean() > 0 else 1.0
+            frequency = Counter(term for c in counts for term in c)
+            for i, c in enumerate(counts):
+                norm = k1 * (1 - b + b * lengths[i] / average)
+                for term, tf in c.items():
+                    idf = math.log(1 + (n - frequency[term] + 0.5) / (frequency[term] + 0.5))
+                    weights[term][i] += field_weight * idf * tf * (k1 + 1) / (tf + norm)
+        self._postings = {
+            term: (np.fromiter(docs.keys(), dtype=np.int32, count=len(docs)),
+                   np.fromiter(docs.values(), dtype=np.float32, count=len(docs)))
+            for term, docs in weights.items()
+        }
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Les k meilleurs documents au sens BM25: [(position, score), ...]"""
+        scores = np.zeros(self._size, dtype=np.float32)
+        for term in set(terms(query)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def _match_name(self, words: List[str], min_similarity: float) -> Tuple[List[int], int, int]:
+        """(lignes, position, nombre de mots) du premier nom de médicament trouvé.
+        Ordre: titre complet, premier mot du titre, puis premier mot approché (fautes de frappe)."""
+        for size in range(min(self._max_title_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                rows = self._titles.get(tuple(words[start:start + size]))
+                if rows and (size > 1 or len(words[start]) >= 3):
+                    return list(rows), start, size
+        for start, word in enumerate(words):
+            if word in self._first_words:
+                return list(self._first_words[word]), start, 1
+        best, best_start, best_score = None, 0, min_similarity
+        for start, word in enumerate(words):
+            if len(word) < 5:
+                continue
+            grams = trigrams(word)
+            candidates = Counter(c for gram in grams for c in self._trigrams.get(gram, ()))
+            for candidate, shared in candidates.items():
+                score = shared / len(grams | trigrams(candidate))
+                if score >= best_score:
+                    best, best_start, best_score = candidate, start, score
+        if best is not None:
+            return list(self._first_words[best]), best_start, 1
+        return [], 0, 0
+
+    def find_medications(self, text: str, min_similarity: float = 0.7) -> Tuple[List[int], int]:
+        """Médicaments nommés dans le texte et nombre de mots du texte que ce nom couvre"""
+        rows, _, size = self._match_name(tokenize(text), min_similarity)
+        return rows, size
+
+    def direct_lookup(self, text: str, keywords: frozenset = DIRECT_LOOKUP_KEYWORDS) -> List[int]:
+        """Lignes du médicament nommé quand la question ne porte que sur sa fiche
+        ("ABUFÈNE posologie"): en dehors du nom, seuls les mots vides et keywords sont
+        admis. Sinon (second médicament, patient, âge, symptôme...) renvoie []."""
+        words = tokenize(text)
+        rows, start, size = self._match_name(words, 0.7)
+        if not rows:
+            return []
+        rest = words[:start] + words[start + size:]
+        if any(len(word) > 1 and word not in STOPWORDS and word not in keywords for word in rest):
+            return []
+        return rows
+
+    def fuse(self, vector_contents: Sequence[str], query: str, k: int = 5, rrf_k: int = 60) -> List[str]:
+        """Recherche hybride: fusion par rangs réciproques (RRF) des résultats vectoriels
+        et des meilleurs résultats BM25; renvoie les k textes de documents retenus"""
+        scores: Dict[str, float] = defaultdict(float)
+        for rank, content in enumerate(vector_contents):
+            scores[content] += 1.0 / (rrf_k + rank + 1)
+        for rank, (i, _) in enumerate(self.search(query, k=max(k, len(vector_contents)))):
+            scores[document_content(self.table.row(i))] += 1.0 / (rrf_k + rank + 1)
+        return sorted(scores, key=scores.get, reverse=True)[:k]
@@ -0,0 +1,320 @@
+"""Test de charge sans navigateur: python loadtest.py --sessions 20 --concurrency 5
+
+Chaque session simulée (streamlit.testing AppTest) parcourt l'application comme un
+visiteur: acceptation des conditions, question au chatbot, recherche d'articles.
+OpenAI et Serper sont remplacés par des serveurs locaux à latence réglable
+(stub_servers), les embeddings sont calculés hors ligne (backend hashing) et les
+index sont construits dans un répertoire temporaire: aucun appel externe."""
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List
+
+import numpy as np
+
+REPO_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(REPO_DIRECTORY, "app.py")
+MEDICATIONS_CSV = "medicaments_propre.csv"
+RETRIEVAL_QUERIES = "retrieval_queries.json"
+
+DEFAULT_SESSIONS = 10
+DEFAULT_CONCURRENCY = 4
+SEARCH_QUERIES = ["fatigue", "sommeil réparateur", "alimentation équilibrée", "mal de dos", "stress",
+                  "hydratation", "activité physique", "immunité", "digestion", "respiration"]
+STEPS = ("terms", "chat", "search")
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+
+
+class ThreadSampler:
+    """Relève périodiquement le nombre de threads du processus"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="thread-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self) -> "ThreadSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _deep_size(value, seen=None) -> int:
+    """Taille en octets d'un objet et de son contenu (conteneurs standards)"""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(key, seen) + _deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in value)
+    return size
+
+
+def session_state_sizes(app) -> Dict[str, int]:
+    """État conservé par une session: session_state complet et historique de conversation
+    (mesurés directement, la RSS du processus ne permettant pas d'isoler une session)"""
+    from chat_history import history_bytes
+
+    # AppTest.session_state enveloppe le SafeSessionState selon la version de Streamlit
+    state = getattr(app.session_state, "_state", app.session_state).filtered_state
+    return {"state_bytes": _deep_size(state), "history_bytes": history_bytes(state.get("messages", []))}
+
+
+def _percentiles(durations: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 en millisecondes"""
+    if not durations:
+        return {}
+    values = np.asarray(durations) * 1000
+    return {f"p{q}": round(float(np.percentile(values, q)), 1) for q in (50, 95, 99)}
+
+
+@contextmanager
+def shared_server_state():
+    """Rend AppTest utilisable par plusieurs sessions simultanées, comme un vrai serveur:
+    - AppTest installe à chaque exécution un Runtime simulé global au processus puis le
+      remet à None: le premier est conservé et partagé par toutes les sessions;
+    - chaque exécution compile le script dans son propre ScriptCache (ast.parse n'est pas
+      sûr entre threads en Python 3.11): un seul cache de bytecode est partagé.
+    Ces attributs internes de Streamlit sont vérifiés avant d'être remplacés, puis
+    restaurés en sortie."""
+    import streamlit
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test
+
+    missing = [
+        name for owner, attribute, name in (
+            (ScriptCache, "get_bytecode", "ScriptCache.get_bytecode"),
+            (Runtime, "_instance", "Runtime._instance"),
+            (app_test, "Runtime", "streamlit.testing.v1.app_test.Runtime"),
+        )
+        if not hasattr(owner, attribute)
+    ]
+    if missing or app_test.Runtime is not Runtime:
+        raise RuntimeError(
+            f"Streamlit {streamlit.__version__}: internes attendus par le test de charge introuvables "
+            f"({', '.join(missing) or 'app_test.Runtime remplacé'}); adapter shared_server_state"
+        )
+
+    shared_cache = ScriptCache()
+    get_bytecode = ScriptCache.get_bytecode
+    instance = Runtime._instance
+
+    class SharedRuntimeType(type(Runtime)):
+        def __setattr__(cls, name, value):
+            if name != "_instance":
+                super().__setattr__(name, value)
+            elif value is not None and Runtime._instance is None:
+                Runtime._instance = value
+
+    ScriptCache.get_bytecode = lambda self, script_path: get_bytecode(shared_cache, script_path)
+    app_test.Runtime = SharedRuntimeType("SharedRuntime", (Runtime,), {})
+    try:
+        yield
+    finally:
+        ScriptCache.get_bytecode = get_bytecode
+        app_test.Runtime = Runtime
+        Runtime._instance = instance
+
+
+def write_secrets(secrets: Dict):
+    """.streamlit/secrets.toml du répertoire courant: AppTest.secrets remplacerait
+    st.secrets pour tout le processus à chaque exécution"""
+    lines, tables = [], []
+    for key, value in secrets.items():
+        if isinstance(value, dict):
+            tables.append(f"[{key}]")
+            tables += [f"{name} = {json.dumps(item)}" for name, item in value.items()]
+        else:
+            lines.append(f"{key} = {json.dumps(value)}")
+    os.makedirs(".streamlit", exist_ok=True)
+    with open(os.path.join(".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines + tables) + "\n")
+
+
+def run_session(question: str, search: str, timeout: float) -> Dict:
+    """Une visite complète; renvoie la durée de chaque étape et la taille de l'état de
+    la session, ou l'erreur rencontrée"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timings: Dict = {}
+    try:
+        start = time.perf_counter()
+        app.run()
+        for checkbox in app.checkbox:
+            checkbox.check()
+        app.run()
+        app.button[0].click().run()
+        timings["terms"] = time.perf_counter() - start
+        if not app.chat_input:
+            raise RuntimeError("page principale non affichée après l'acceptation des conditions")
+
+        start = time.perf_counter()
+        app.chat_input[0].set_value(question).run()
+        timings["chat"] = time.perf_counter() - start
+        answer = app.chat_message[-1].markdown
+        if not answer or 'class="response"' not in answer[0].value:
+            raise RuntimeError("aucune réponse structurée du chatbot")
+
+        start = time.perf_counter()
+        app.sidebar.text_input[0].input(search).run()
+        timings["search"] = time.perf_counter() - start
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+        timings.update(session_state_sizes(app))
+    except Exception as e:
+        timings["error"] = f"{type(e).__name__}: {str(e)}"
+    return timings
+
+
+def run_load(sessions: int, concurrency: int, openai_latency: float, serper_latency: float,
+             streaming: bool = True, timeout: float = 60) -> Dict:
+    """Démarre les serveurs simulés, prépare le moteur avec une session de
+    préchauffage puis lance les sessions, concurrency à la fois"""
+    from streamlit.logger import set_log_level
+    from stub_servers import StubOpenAIServer, StubSerperServer
+    from telemetry import get_telemetry
+
+    with open(os.path.join(REPO_DIRECTORY, RETRIEVAL_QUERIES), encoding="utf-8") as f:
+        questions = [item["query"] for item in json.load(f)]
+
+    with StubOpenAIServer(latency=openai_latency) as openai_server, \
+            StubSerperServer(latency=serper_latency) as serper_server:
+        # Le client openai et les réglages du moteur (settings.get_setting) lisent l'environnement
+        os.environ["OPENAI_BASE_URL"] = openai_server.url
+        os.environ["EMBEDDING_BACKEND"] = "hashing"
+        write_secrets({
+            "OpenAI_key": "stub",
+            "SERPER_API_KEY": "stub",
+            "SERPER_URL": serper_server.url,
+            "STREAM_RESPONSES": streaming,
+            "TELEMETRY": {"log_spans": False}
+        })
+        with shared_server_state():
+            # Préchauffage: moteur médical, index et articles construits une fois par processus
+            start = time.perf_counter()
+            timings = run_session(questions[0], SEARCH_QUERIES[0], timeout=600)
+            warmup_seconds = time.perf_counter() - start
+            if "error" in timings:
+                raise RuntimeError(f"Échec de la session de préchauffage: {timings['error']}")
+            print(f"Préchauffage: {warmup_seconds:.1f}s", file=sys.stderr)
+            # Avertissements de Streamlit en mode sans navigateur (libellés vides, avec pile d'appels),
+            # après le préchauffage qui a chargé la configuration et son niveau de journalisation
+            set_log_level("error")
+
+            threads_before = threading.active_count()
+            gc.collect()
+            rss_before = _rss_mb()
+            start = time.perf_counter()
+            with ThreadSampler() as sampler, ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(
+                    lambda i: run_session(questions[i % len(questions)], SEARCH_QUERIES[i % len(SEARCH_QUERIES)], timeout),
+                    range(sessions)
+                ))
+            elapsed = time.perf_counter() - start
+            gc.collect()
+            rss_after = _rss_mb()
+            openai_requests, serper_requests = openai_server.requests, serper_server.requests
+
+    completed = [timings for timings in results if "error" not in timings]
+    errors = [timings["error"] for timings in results if "error" in timings]
+    state_kb = np.asarray([timings["state_bytes"] for timings in completed]) / 1024
+    history_kb = np.asarray([timings["history_bytes"] for timings in completed]) / 1024
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "streaming": streaming,
+        "openai_latency_ms": openai_latency * 1000,
+        "serper_latency_ms": serper_latency * 1000,
+        "warmup_seconds": round(warmup_seconds, 2),
+        "elapsed_seconds": round(elapsed, 2),
+        "completed": len(completed),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "sessions_per_second": round(len(completed) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            step: _percentiles([timings[step] for timings in results if step in timings])
+            for step in STEPS
+        },
+        "session_ms": _percentiles([sum(timings[step] for step in STEPS) for timings in completed]),
+        "threads": {"before": threads_before, "peak": sampler.peak, "after": threading.active_count()},
+        # RSS du processus, à titre indicatif (allocateur, caches partagés, threads)
+        "rss_mb": {"before": round(rss_before, 1), "after": round(rss_after, 1)},
+        "session_state_kb": {
+            "mean": round(float(state_kb.mean()), 1) if len(state_kb) else 0.0,
+            "max": round(float(state_kb.max()), 1) if len(state_kb) else 0.0,
+            "history_mean": round(float(history_kb.mean()), 1) if len(history_kb) else 0.0
+        },
+        "upstream_requests": {"openai": openai_requests, "serper": serper_requests},
+        "stages": get_telemetry().snapshot()["spans"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de LIBERCARE (sessions Streamlit simulées)")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--openai-latency", type=float, default=0.5, help="latence simulée d'OpenAI (s)")
+    parser.add_argument("--serper-latency", type=float, default=0.2, help="latence simulée de Serper (s)")
+    parser.add_argument("--no-stream", action="store_true", help="réponses complètes plutôt qu'en streaming")
+    parser.add_argument("--timeout", type=float, default=60, help="délai maximal d'une exécution du script (s)")
+    parser.add_argument("--report", help="rapport JSON écrit")
+    args = parser.parse_args()
+
+    # Index, caches et instantanés générés dans un répertoire jetable (chemins relatifs)
+    directory = tempfile.mkdtemp(prefix="libercare-load-")
+    shutil.copy(os.path.join(REPO_DIRECTORY, MEDICATIONS_CSV), directory)
+    os.chdir(directory)
+    try:
+        report = run_load(args.sessions, args.concurrency, args.openai_latency, args.serper_latency,
+                          streaming=not args.no_stream, timeout=args.timeout)
+    finally:
+        os.chdir(REPO_DIRECTORY)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{report['completed']}/{report['sessions']} sessions en {report['elapsed_seconds']}s "
+          f"({report['sessions_per_second']} sessions/s, concurrence {report['concurrency']}), "
+          f"{report['errors']} erreurs")
+    for step in STEPS:
+        stats = report["latency_ms"][step]
+        if stats:
+            print(f"{step:<7} p50 {stats['p50']:>8.1f} ms  p95 {stats['p95']:>8.1f} ms  p99 {stats['p99']:>8.1f} ms")
+    print(f"Threads: {report['threads']['before']} avant, {report['threads']['peak']} au pic, "
+          f"{report['threads']['after']} après")
+    state = report["session_state_kb"]
+    print(f"État par session: {state['mean']} Ko en moyenne, {state['max']} Ko au plus "
+          f"(historique {state['history_mean']} Ko); RSS du processus "
+          f"{report['rss_mb']['before']} -> {report['rss_mb']['after']} Mo")
+    for sample in report["error_samples"]:
+        print(f"Erreur: {sample}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+from langchain.vectorstores import Chroma
+
+# Incrémenter à chaque changement du format des documents indexés
+INDEX_SCHEMA_VERSION = 2
+
+# Nombre de textes envoyés par appel d'embedding lors de la synchronisation
+DEFAULT_EMBEDDING_BATCH_SIZE = 100
+
+# Correspondance explicite entre les colonnes de medicaments_propre.csv,
+# les clés de métadonnées et les libellés du texte vectorisé (None = hors texte)
+DOCUMENT_SCHEMA = [
+    ("titre", "name", "Médicament"),
+    ("famille_medicament", "category", "Catégorie"),
+    ("cas_utilisation", "symptoms", "Indications"),
+    ("posologie", "posologie", "Posologie"),
+    ("contre_indication", "contre_indication", "Contre-indications"),
+    ("grossesse_allaitement_fertilite", "grossesse_allaitement", None),
+    ("effet_indesirable", "effet_indesirable", None),
+    ("interraction_substance", "interactions", None)
+]
+
+
+class MedicalDocument(NamedTuple):
+    """Document prêt à être indexé: texte vectorisé et métadonnées (chaînes uniquement)"""
+    content: str
+    metadata: Dict[str, str]
+
+
+def manifest_path(persist_directory: str) -> str:
+    """Chemin du manifeste stocké à côté du répertoire de la base vectorielle"""
+    return os.path.normpath(persist_directory) + ".manifest.json"
+
+
+def file_checksum(path: str) -> str:
+    """Calcule l'empreinte SHA-256 d'un fichier par blocs"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def embedding_model_name(embeddings) -> str:
+    """Identifiant du modèle d'embedding, pour invalider l'index si le modèle change"""
+    return str(getattr(embeddings, "model", type(embeddings).__name__))
+
+
+def read_manifest(persist_directory: str) -> Optional[Dict]:
+    """Lit le manifeste de l'index, ou None s'il est absent ou illisible"""
+    try:
+        with open(manifest_path(persist_directory), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(persist_directory: str, csv_checksum: str, count: int, model: str) -> Dict:
+    """Écrit le manifeste de façon atomique après une (re)construction de l'index"""
+    manifest = {
+        "schema_version": INDEX_SCHEMA_VERSION,
+        "csv_sha256": csv_checksum,
+        "count": count,
+        "embedding_model": model,
+        "updated_at": int(time.time())
+    }
+    path = manifest_path(persist_directory)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def collection_count(vectorstore) -> int:
+    """Nombre de documents de la collection Chroma (lecture locale, sans appel réseau)"""
+    return vectorstore._collection.count()
+
+
+def is_index_valid(vectorstore, persist_directory: str, csv_checksum: str, model: str) -> bool:
+    """Vérifie localement que l'index correspond au CSV, au schéma et au modèle courants"""
+    manifest = read_manifest(persist_directory)
+    if not manifest:
+        return False
+    if manifest.get("schema_version") != INDEX_SCHEMA_VERSION:
+        return False
+    if manifest.get("csv_sha256") != csv_checksum or manifest.get("embedding_model") != model:
+        return False
+    try:
+        count = collection_count(vectorstore)
+    except Exception:
+        return False
+    return count > 0 and count == manifest.get("count")
+
+
+def index_model_changed(vectorstore, persist_directory: str, model: str) -> bool:
+    """Vrai si la collection contient des vecteurs d'un autre modèle d'embedding, ou d'un
+    modèle inconnu (pas de manifeste): dimension et espace différents, ils ne peuvent
+    pas être conservés par sync_index"""
+    manifest = read_manifest(persist_directory) or {}
+    return manifest.get("embedding_model") != model and collection_count(vectorstore) > 0
+
+
+def build_medical_documents(medications: pd.DataFrame) -> List[MedicalDocument]:
+    """Construit les documents colonne par colonne (sans iterrows) à partir du CSV"""
+    columns = [column for column, _, _ in DOCUMENT_SCHEMA]
+    frame = medications.reindex(columns=columns).fillna("").astype(str)
+    frame = frame.apply(lambda col: col.str.strip())
+    frame = frame[frame["titre"] != ""]
+
+    content = None
+    for column, _, label in DOCUMENT_SCHEMA:
+        if label is None:
+            continue
+        line = label + ": " + frame[column]
+        content = line if content is None else content + "\n" + line
+
+    keys = [key for _, key, _ in DOCUMENT_SCHEMA]
+    return [
+        MedicalDocument(text, dict(zip(keys, values)))
+        for text, *values in zip(content.tolist(), *(frame[c].tolist() for c in columns))
+    ]
+
+
+def document_content(record: Dict[str, str]) -> str:
+    """Texte vectorisé d'une seule ligne, identique à celui de build_medical_documents"""
+    return "\n".join(
+        f"{label}: {str(record.get(column) or '').strip()}"
+        for column, _, label in DOCUMENT_SCHEMA if label is not None
+    )
+
+
+def document_hash(document: MedicalDocument) -> str:
+    """Empreinte d'un document (contenu + métadonnées), utilisée aussi comme identifiant"""
+    payload = json.dumps(
+        [document.content, document.metadata],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def sync_index(vectorstore, documents: List[MedicalDocument], batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE) -> Dict[str, int]:
+    """Synchronise la collection avec les documents: seuls les documents nouveaux ou
+    modifiés sont vectorisés, les documents disparus sont supprimés.
+    L'empreinte ignore le modèle d'embedding: après un changement de modèle, la
+    collection doit être recréée au préalable (index_model_changed)."""
+    collection = vectorstore._collection
+
+    wanted = {}
+    for document in documents:
+        row_hash = document_hash(document)
+        wanted[row_hash] = {
+            "content": document.content,
+            "metadata": dict(document.metadata, row_hash=row_hash)
+        }
+
+    existing = collection.get(include=["metadatas"])
+    present = set()
+    stale_ids = []
+    for doc_id, metadata in zip(existing["ids"], existing["metadatas"]):
+        row_hash = (metadata or {}).get("row_hash")
+        # Les documents sans empreinte (anciens index) ou en double sont remplacés
+        if row_hash in wanted and row_hash == doc_id and row_hash not in present:
+            present.add(row_hash)
+        else:
+            stale_ids.append(doc_id)
+
+    for i in range(0, len(stale_ids), batch_size):
+        collection.delete(ids=stale_ids[i:i + batch_size])
+
+    new_hashes = [row_hash for row_hash in wanted if row_hash not in present]
+    for i in range(0, len(new_hashes), batch_size):
+        batch = new_hashes[i:i + batch_size]
+        vectorstore.add_texts(
+            texts=[wanted[h]["content"] for h in batch],
+            metadatas=[wanted[h]["metadata"] for h in batch],
+            ids=batch
+        )
+
+    return {
+        "added": len(new_hashes),
+        "deleted": len(stale_ids),
+        "unchanged": len(present),
+        "total": len(wanted)
+    }
+
+
+def open_medical_index(persist_directory: str, embeddings, csv_checksum: str,
+                       load_documents: Callable[[], List[MedicalDocument]],
+                       batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE) -> Tuple[Chroma, Optional[Dict[str, int]]]:
+    """Ouvre l'index Chroma et le met à jour si besoin: renvoie la base et les
+    changements de sync_index (None si le manifeste était à jour).
+    load_documents n'est appelé que si l'index doit être synchronisé."""
+    os.makedirs(persist_directory, exist_ok=True)
+
+    # Vérification locale (manifeste + nombre de documents), sans appel à l'API
+    model = embedding_model_name(embeddings)
+    vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    if is_index_valid(vectorstore, persist_directory, csv_checksum, model):
+        return vectorstore, None
+
+    # Changement de backend ou de modèle: les vecteurs existants sont inutilisables
+    if index_model_changed(vectorstore, persist_directory, model):
+        print(f"Modèle d'embedding changé ({model}): reconstruction complète de l'index")
+        vectorstore.delete_collection()
+        vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+
+    # Seules les lignes ajoutées ou modifiées (toutes après un changement de modèle) sont vectorisées
+    changes = sync_index(vectorstore, load_documents(), batch_size=batch_size)
+    print(f"Index médical synchronisé: {changes}")
+    vectorstore.persist()
+    write_manifest(persist_directory, csv_checksum, collection_count(vectorstore), model)
+    return vectorstore, changes
@@ -0,0 +1,68 @@
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from medical_index import file_checksum
+
+MEDICATION_TABLE_PATH = "./medical_db/medications.arrow"
+
+
+class MedicationTable:
+    """Table des médicaments au format Arrow IPC non compressé, projetée en mémoire:
+    l'ouverture ne lit que l'en-tête, et seules les pages des colonnes ou lignes
+    consultées sont chargées (sans copie, partagées entre processus par le système)"""
+
+    def __init__(self, path: str = MEDICATION_TABLE_PATH):
+        self.path = path
+        self._table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        metadata = self._table.schema.metadata or {}
+        self.csv_checksum = metadata.get(b"csv_sha256", b"").decode()
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    @property
+    def columns(self) -> List[str]:
+        return self._table.column_names
+
+    def column(self, name: str) -> List[str]:
+        """Valeurs d'une colonne (chaînes décodées à la demande, non conservées)"""
+        return self._table.column(name).to_pylist()
+
+    def row(self, position: int) -> Dict[str, str]:
+        return {name: self._table.column(name)[position].as_py() for name in self.columns}
+
+    def to_frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """DataFrame pandas (copie), pour la reconstruction ponctuelle de l'index vectoriel"""
+        table = self._table.select(columns) if columns else self._table
+        return table.to_pandas()
+
+    @classmethod
+    def build(cls, csv_path: str, path: str = MEDICATION_TABLE_PATH,
+              checksum: Optional[str] = None) -> "MedicationTable":
+        """Convertit le CSV en table Arrow (écriture atomique), valeurs manquantes -> "" """
+        frame = pd.read_csv(csv_path).fillna("").astype(str)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({"csv_sha256": checksum or file_checksum(csv_path)})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+
+def load_medication_table(csv_path: str, path: str = MEDICATION_TABLE_PATH) -> MedicationTable:
+    """Ouvre la table Arrow, reconstruite seulement si elle manque ou si le CSV a changé"""
+    checksum = file_checksum(csv_path)
+    try:
+        table = MedicationTable(path)
+        if table.csv_checksum == checksum:
+            return table
+    except (OSError, pa.ArrowInvalid):
+        pass
+    print(f"Construction de la table des médicaments: {path}")
+    return MedicationTable.build(csv_path, path, checksum)
@@ -0,0 +1,285 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional, TypeVar
+
+import requests
+
+T = TypeVar("T")
+
+# Réglages par service externe (surchargés via configure_upstreams)
+UPSTREAM_DEFAULTS = {
+    "serper": {"max_concurrency": 10, "failure_threshold": 5, "reset_timeout": 30, "retries": 1, "timeout": 10},
+    "openai_chat": {"max_concurrency": 8, "failure_threshold": 5, "reset_timeout": 30, "retries": 1, "timeout": 30},
+    "openai_embeddings": {"max_concurrency": 16, "failure_threshold": 5, "reset_timeout": 30, "retries": 2, "timeout": 10}
+}
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+
+def is_timeout(error: Exception) -> bool:
+    """Délai de la tentative dépassé (requests, socket ou client openai)"""
+    if isinstance(error, (requests.Timeout, TimeoutError)):
+        return True
+    return any(cls.__name__ == "APITimeoutError" for cls in type(error).__mro__)
+
+
+class UpstreamUnavailable(Exception):
+    """Appel refusé sans être tenté (circuit ouvert, service saturé ou délai épuisé)"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Erreurs passagères: coupures réseau, délais dépassés, 429 et 5xx"""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _RETRYABLE_NAMES for cls in type(error).__mro__):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status in _RETRYABLE_STATUS
+
+
+class Deadline:
+    """Échéance absolue transmise d'appel en appel"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class CircuitBreaker:
+    """Ouvre le circuit après failure_threshold échecs consécutifs; après reset_timeout,
+    un seul appel d'essai est autorisé (semi-ouvert) avant de refermer ou rouvrir"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def cancel_trial(self):
+        """L'appel d'essai n'a pas eu lieu: un autre pourra le faire"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class Upstream:
+    """Service externe protégé: disjoncteur, concurrence bornée, relances avec gigue
+    et propagation de l'échéance à chaque tentative"""
+
+    def __init__(self, name: str, max_concurrency: int = 10, failure_threshold: int = 5,
+                 reset_timeout: float = 30, retries: int = 1, timeout: float = 10,
+                 base_delay: float = 0.2, max_delay: float = 2.0):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.expired = 0  # Échéances de l'appelant atteintes: ni succès ni échec du service
+        self._lock = threading.Lock()
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _acquire(self, deadline: Deadline):
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise UpstreamUnavailable(f"{self.name}: circuit ouvert")
+        # Pas de file d'attente illimitée: on attend une place au plus 1 s
+        if not self._slots.acquire(timeout=min(1.0, deadline.remaining())):
+            self._count("rejected")
+            self.breaker.cancel_trial()
+            raise UpstreamUnavailable(f"{self.name}: trop d'appels simultanés")
+
+    def _attempt(self, func: Callable[[float], T], deadline: Deadline, caller_deadline: bool = False) -> T:
+        """Tentatives successives de func(timeout); l'échec définitif est enregistré
+        par le disjoncteur, le succès par l'appelant. L'échéance fournie par l'appelant
+        (caller_deadline), atteinte avant une tentative ou pendant une tentative
+        raccourcie par elle, n'est pas un échec du service tant qu'aucune tentative
+        précédente n'a échoué: elle est comptée à part et n'ouvre pas le circuit."""
+        attempt = 0
+        while True:
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                self._expire(failed=attempt > 0)
+                raise UpstreamUnavailable(f"{self.name}: délai épuisé")
+            self._count("calls")
+            try:
+                return func(min(self.timeout, remaining))
+            except Exception as e:
+                if caller_deadline and remaining < self.timeout and is_timeout(e):
+                    self._expire(failed=attempt > 0)
+                    raise
+                if not is_retryable(e):
+                    # Erreur de la requête elle-même: le service est considéré joignable
+                    self.breaker.record_success()
+                    raise
+                self._count("errors")
+                attempt += 1
+                # Backoff exponentiel avec gigue complète, borné par l'échéance
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if attempt > self.retries or delay >= deadline.remaining():
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(delay)
+
+    def _expire(self, failed: bool):
+        self._count("expired")
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.cancel_trial()
+
+    def call(self, func: Callable[[float], T], deadline: Optional[Deadline] = None) -> T:
+        """Appelle func(timeout) où timeout est le temps restant pour cette tentative"""
+        caller_deadline = deadline is not None
+        deadline = deadline or Deadline(self.timeout * (self.retries + 1))
+        self._acquire(deadline)
+        try:
+            result = self._attempt(func, deadline, caller_deadline)
+            self.breaker.record_success()
+            return result
+        finally:
+            self._slots.release()
+
+    def stream(self, func: Callable[[float], Iterable], deadline: Optional[Deadline] = None) -> "GuardedStream":
+        """Comme call pour une réponse en flux: func(timeout) ouvre le flux (avec relances),
+        puis la place et le disjoncteur restent engagés jusqu'à la fin de sa lecture"""
+        caller_deadline = deadline is not None
+        deadline = deadline or Deadline(self.timeout * (self.retries + 1))
+        self._acquire(deadline)
+        try:
+            stream = self._attempt(func, deadline, caller_deadline)
+        except BaseException:
+            self._slots.release()
+            raise
+        return GuardedStream(self, stream)
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "error_rate": round(self.errors / self.calls, 3) if self.calls else 0.0
+        }
+
+
+class GuardedStream:
+    """Flux ouvert par Upstream.stream. Le succès est enregistré après le dernier
+    fragment, l'échec si la lecture s'interrompt sur une erreur passagère; la place
+    est rendue à la fin de la lecture ou à la fermeture (with, close)."""
+
+    def __init__(self, upstream: Upstream, stream: Iterable):
+        self.upstream = upstream
+        self._stream = stream
+        self._finished = False
+        self._released = False
+
+    def __iter__(self) -> Iterator:
+        try:
+            for chunk in self._stream:
+                yield chunk
+        except Exception as e:
+            if is_retryable(e):
+                self.upstream._count("errors")
+                self.upstream.breaker.record_failure()
+            else:
+                self.upstream.breaker.record_success()
+            self._finished = True
+            raise
+        else:
+            self.upstream.breaker.record_success()
+            self._finished = True
+        finally:
+            self.close()
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        if not self._finished:
+            # Lecture abandonnée: ni succès ni échec, l'essai éventuel est annulé
+            self.upstream.breaker.cancel_trial()
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            close()
+        self.upstream._slots.release()
+
+    def __enter__(self) -> "GuardedStream":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_upstreams: Dict[str, Upstream] = {}
+_upstreams_lock = threading.Lock()
+_configured = False
+
+
+def get_upstream(name: str) -> Upstream:
+    """Protection unique par service externe pour tout le processus"""
+    with _upstreams_lock:
+        if name not in _upstreams:
+            _upstreams[name] = Upstream(name, **UPSTREAM_DEFAULTS.get(name, {}))
+        return _upstreams[name]
+
+
+def configure_upstreams(settings: Dict[str, Dict]):
+    """Applique une seule fois par processus des réglages surchargeant UPSTREAM_DEFAULTS
+    (les relances du script Streamlit ne réinitialisent pas les disjoncteurs)"""
+    global _configured
+    with _upstreams_lock:
+        if _configured:
+            return
+        _configured = True
+        for name, options in settings.items():
+            _upstreams[name] = Upstream(name, **dict(UPSTREAM_DEFAULTS.get(name, {}), **options))
+
+
+def upstream_stats() -> Dict[str, Dict]:
+    with _upstreams_lock:
+        return {name: upstream.stats() for name, upstream in _upstreams.items()}
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class SemanticResponseCache:
+    """Cache des réponses indexé par l'embedding de la question.
+
+    Une question dont la similarité cosinus avec une question déjà traitée (même
+    langue) dépasse le seuil réutilise sa réponse. Les entrées expirent après ttl
+    secondes et les moins récemment utilisées sont évincées au-delà de max_entries.
+    Partagé par toutes les sessions du processus, optionnellement persisté sur disque.
+    Sans seuil (threshold=None), le cache est désactivé: rien n'est stocké ni servi."""
+
+    def __init__(self, threshold: Optional[float] = None, ttl: float = 86400, max_entries: int = 512,
+                 persist_path: Optional[str] = None, save_interval: float = 60):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._next_id = 0
+        self._matrix = None  # (ids, vecteurs empilés), reconstruit après modification
+        self._last_save = time.time()
+        self._lock = threading.Lock()
+        if persist_path and self.enabled:
+            self.load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold is not None
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now: float):
+        expired = [key for key, entry in self._entries.items() if now - entry["created_at"] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _stacked(self):
+        if self._matrix is None:
+            ids = list(self._entries.keys())
+            vectors = np.stack([self._entries[i]["vector"] for i in ids]) if ids else None
+            self._matrix = (ids, vectors)
+        return self._matrix
+
+    def lookup(self, embedding, language: str):
+        """Renvoie la réponse d'une question suffisamment proche, ou None"""
+        if not self.enabled:
+            return None
+        query = self._normalize(embedding)
+        with self._lock:
+            self._expire(time.time())
+            ids, vectors = self._stacked()
+            if vectors is not None and vectors.shape[1] == query.shape[0]:
+                scores = vectors @ query
+                for position in np.argsort(-scores):
+                    if scores[position] < self.threshold:
+                        break
+                    entry = self._entries[ids[position]]
+                    if entry["language"] == language:
+                        self._entries.move_to_end(ids[position])
+                        self.hits += 1
+                        return entry["value"]
+            self.misses += 1
+            return None
+
+    def store(self, embedding, language: str, value):
+        """Ajoute une réponse (doit être sérialisable en JSON pour la persistance)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[self._next_id] = {
+                "vector": self._normalize(embedding),
+                "language": language,
+                "value": value,
+                "created_at": time.time()
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+            should_save = self.persist_path and time.time() - self._last_save > self.save_interval
+        if should_save:
+            self.save()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "size": len(self._entries),
+            "llm_calls_saved": self.hits
+        }
+
+    def save(self):
+        """Écrit le cache sur disque (vecteurs en .npz, réponses en JSON)"""
+        if not self.persist_path:
+            return
+        with self._lock:
+            entries: List[Dict] = list(self._entries.values())
+            self._last_save = time.time()
+        if not entries:
+            return
+        tmp_path = self.persist_path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            vectors=np.stack([entry["vector"] for entry in entries]),
+            created_at=np.array([entry["created_at"] for entry in entries]),
+            languages=np.array([entry["language"] for entry in entries]),
+            values=np.array([json.dumps(entry["value"], ensure_ascii=False) for entry in entries])
+        )
+        os.replace(tmp_path, self.persist_path)
+
+    def load(self):
+        """Recharge le cache persisté, en ignorant les entrées expirées"""
+        try:
+            with np.load(self.persist_path) as data:
+                rows = zip(data["vectors"], data["created_at"], data["languages"], data["values"])
+                with self._lock:
+                    for vector, created_at, language, value in rows:
+                        self._entries[self._next_id] = {
+                            "vector": vector,
+                            "language": str(language),
+                            "value": json.loads(str(value)),
+                            "created_at": float(created_at)
+                        }
+                        self._next_id += 1
+                    self._expire(time.time())
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                    self._matrix = None
+        except (OSError, ValueError, KeyError):
+            pass
@@ -0,0 +1,95 @@
+import re
+from typing import Dict, List, NamedTuple
+
+# Émojis délimitant les sections de la réponse du modèle
+SECTION_MARKERS = {
+    "💊": "medications",
+    "🌿": "remedies",
+    "⚠": "precautions"
+}
+
+_MARKER_RE = re.compile("(💊|🌿|⚠)\ufe0f?")
+_NUMBERING_RE = re.compile(r"^\d+[.)]?$")
+
+
+class ResponseSections(NamedTuple):
+    """Réponse découpée: une liste d'éléments par section"""
+    medications: List[str]
+    remedies: List[str]
+    precautions: List[str]
+
+
+class SectionStreamParser:
+    """Découpe la réponse en sections au fil des fragments reçus du streaming.
+
+    Le texte qui suit un émoji de section lui est rattaché jusqu'au prochain émoji;
+    chaque ligne non vide devient un élément de la section courante."""
+
+    def __init__(self):
+        self.sections: Dict[str, List[str]] = {name: [] for name in SECTION_MARKERS.values()}
+        self.current = None
+        self._line = ""
+        self._pending = ""
+
+    def feed(self, chunk: str):
+        """Ajoute un fragment de texte reçu du modèle"""
+        text = self._pending + chunk
+        # "⚠" peut être suivi du sélecteur de variante dans le fragment suivant
+        if text.endswith("⚠"):
+            text, self._pending = text[:-1], "⚠"
+        else:
+            self._pending = ""
+
+        position = 0
+        for match in _MARKER_RE.finditer(text):
+            self._append(text[position:match.start()])
+            self._flush_line()
+            self.current = SECTION_MARKERS[match.group(1)]
+            position = match.end()
+        self._append(text[position:])
+
+    def close(self):
+        """Termine l'analyse en intégrant la dernière ligne incomplète"""
+        if self._pending:
+            self.feed("")
+            self._pending = ""
+        self._flush_line()
+
+    def snapshot(self) -> Dict[str, List[str]]:
+        """État courant des sections, ligne en cours d'écriture comprise"""
+        sections = {name: list(items) for name, items in self.sections.items()}
+        line = self._line.strip()
+        if self.current and line:
+            sections[self.current].append(line)
+        return sections
+
+    def _append(self, text: str):
+        if self.current is None or not text:
+            return
+        lines = text.split("\n")
+        self._line += lines[0]
+        for line in lines[1:]:
+            self._flush_line()
+            self._line = line
+
+    def _flush_line(self):
+        line = self._line.strip()
+        self._line = ""
+        # Ignore les numéros de liste isolés ("2.") qui précèdent l'émoji suivant
+        if self.current and line and not _NUMBERING_RE.match(line):
+            self.sections[self.current].append(line)
+
+
+def parse_response(text: str) -> ResponseSections:
+    """Découpe une réponse complète en un seul passage (mêmes règles que le streaming):
+    un découpage par émoji, puis un découpage en lignes par section"""
+    sections: Dict[str, List[str]] = {name: [] for name in SECTION_MARKERS.values()}
+    parts = _MARKER_RE.split(text)
+    # parts = [texte avant le premier émoji, émoji, texte, émoji, texte, ...]
+    for marker, body in zip(parts[1::2], parts[2::2]):
+        items = sections[SECTION_MARKERS[marker]]
+        for line in body.split("\n"):
+            line = line.strip()
+            if line and not (line[0].isdigit() and _NUMBERING_RE.match(line)):
+                items.append(line)
+    return ResponseSections(**sections)
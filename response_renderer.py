@@ -0,0 +1,36 @@
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+# Gabarits préparés une seule fois; la mise en forme est portée par les classes CSS
+# "response-*" de styles.load_css
+_RESPONSE = (
+    '<div class="response">'
+    '<div class="response-row">'
+    '<div class="response-card response-medications"><h3>💊 Médicaments recommandés</h3><ul>{medications}</ul></div>'
+    '<div class="response-card response-remedies"><h3>🌿 Remèdes naturels</h3><ul>{remedies}</ul></div>'
+    '</div>'
+    '{precautions}'
+    '</div>'
+)
+_PRECAUTIONS = '<div class="response-card response-precautions"><h3>⚠️ Précautions</h3><ul>{items}</ul></div>'
+
+
+def _items(values: Iterable[str]) -> str:
+    return "".join(f"<li>{value}</li>" for value in values if value)
+
+
+def render_sections(medications: Iterable[str], remedies: Iterable[str], precautions: Iterable[str]) -> str:
+    """HTML d'une réponse: un seul assemblage, proportionnel au nombre d'éléments"""
+    precautions = _items(precautions)
+    return _RESPONSE.format(
+        medications=_items(medications),
+        remedies=_items(remedies),
+        precautions=_PRECAUTIONS.format(items=precautions) if precautions else ""
+    )
+
+
+@lru_cache(maxsize=256)
+def render_history_sections(medications: Tuple[str, ...], remedies: Tuple[str, ...],
+                            precautions: Tuple[str, ...]) -> str:
+    """Rendu mémorisé des réponses de l'historique, réaffichées à chaque relance du script"""
+    return render_sections(medications, remedies, precautions)
@@ -1,17 +1,66 @@
-import requests
-import streamlit as st
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
-from datetime import datetime, timedelta
+import os
 import random
-from functools import lru_cache
+import threading
 import time
+from content_filter import get_content_filter
+from resilience import Deadline
+from serper_client import SERPER_URL, get_serper_client
+from settings import get_setting
+from telemetry import register_collector, span
+from ttl_cache import TTLCache
+
+ARTICLES_SNAPSHOT_PATH = "./articles_snapshot.json"
+MIN_SEARCH_LENGTH = 3  # Longueur minimale d'une recherche dans la barre latérale
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+_snapshot_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """Normalise une requête (casse, espaces) pour partager les résultats en cache"""
+    return " ".join(query.casefold().split())
+
+
+def get_search_cache(persist_path: Optional[str] = None) -> TTLCache:
+    """Cache des résultats Serper partagé par toutes les sessions du processus"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = TTLCache(max_entries=256, persist_path=persist_path)
+            register_collector("cache", lambda: {"search": _search_cache.stats()}, key="search")
+        return _search_cache
+
 
 class ArticleSearch:
-    def __init__(self):
-        self.api_key = st.secrets["SERPER_API_KEY"]
-        self.base_url = "https://google.serper.dev/search"
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 snapshot_path: Optional[str] = None):
+        cache_path = None
+        filter_rules = None
+        if api_key is None:
+            api_key = get_setting("SERPER_API_KEY", required=True)
+            base_url = base_url or get_setting("SERPER_URL")
+            cache_path = get_setting("SEARCH_CACHE_PATH")
+            filter_rules = dict(get_setting("CONTENT_FILTER", {}))
+            snapshot_path = snapshot_path or get_setting("ARTICLES_SNAPSHOT_PATH", ARTICLES_SNAPSHOT_PATH)
+        self.api_key = api_key
+        self.base_url = base_url or SERPER_URL
         self.cache_timeout = 43200  # 12 heures en secondes
+        self.search_timeout = 3600  # Durée de fraîcheur des recherches de la barre latérale
+        self.request_timeout = 10  # Délai maximal par requête (secondes)
+        self.articles_budget = 12  # Budget global du chargement des articles (secondes)
+        # Client HTTP partagé par le processus (connexions keep-alive, pool de threads)
+        self.client = get_serper_client(self.api_key, self.base_url)
+        # Cache partagé: une requête Serper par sujet et par fenêtre de 12 heures
+        self.cache = get_search_cache(cache_path)
+        # Filtres des résultats commerciaux, compilés une seule fois pour toutes les langues:
+        # articles recommandés et actualités de la barre latérale (termes supplémentaires)
+        self.content_filter = get_content_filter(filter_rules)
+        self.news_filter = get_content_filter(filter_rules, news=True)
+        # Dernier résultat valide par langue, servi immédiatement après un redémarrage
+        self.snapshot_path = snapshot_path
         
         # Plusieurs images par défaut pour chaque catégorie
         self.default_images = {
@@ -58,113 +107,100 @@ class ArticleSearch:
         all_images = [img for images in self.default_images.values() for img in images]
         return random.choice(all_images)
 
-    @lru_cache(maxsize=32)
-    def _cached_search(self, query: str, language: str, timestamp: int) -> List[Dict]:
-        """Recherche en cache d'articles avec filtrage des résultats"""
-        payload = json.dumps({
+    def _cached_search(self, query: str, language: str, timestamp: int, fresh: bool = False,
+                       deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Recherche en cache d'articles avec filtrage des résultats
+        (fresh: pas de résultat d'une fenêtre précédente; deadline: échéance commune
+        aux sujets chargés en parallèle)"""
+        with span("article_search", language=language) as attributes:
+            def load() -> List[Dict]:
+                attributes["cache_hit"] = False
+                # Un rafraîchissement en arrière-plan lancé après l'échéance a son propre délai
+                return self._search(query, deadline if deadline is not None and not deadline.expired() else None)
+
+            attributes["cache_hit"] = True
+            try:
+                results = self.cache.get((query, language), load, bucket=timestamp, fresh_only=fresh)
+            except Exception as e:
+                attributes["error"] = str(e)
+                print(f"Erreur de recherche: {str(e)}")
+                return []
+            attributes["results"] = len(results)
+            return results
+
+    def _search(self, query: str, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Interroge Serper et filtre les résultats commerciaux"""
+        payload = {
             "q": query,
             "num": 30  # Demande plus de résultats pour un meilleur filtrage
-        })
-        
-        headers = {
-            'X-API-KEY': self.api_key,
-            'Content-Type': 'application/json'
         }
         
+        with span("serper"):
+            results = self.client.search(payload, timeout=self.request_timeout, deadline=deadline)
+        
+        # Filtre les résultats commerciaux (titre et lien)
+        return [
+            {
+                'title': item.get('title', ''),
+                'url': item.get('link', ''),
+                'snippet': item.get('snippet', '')
+            }
+            for item in self.content_filter.filter_results(results.get('organic', []), ('title', 'link'))
+        ]
+
+    def search_articles(self, query: str, language: str = 'fr') -> List[Dict]:
+        """Recherche des articles avec la requête donnée"""
+        normalized = normalize_query(query)
+        if len(normalized) < MIN_SEARCH_LENGTH:
+            return []
+        # Requêtes identiques (après normalisation) partagées entre sessions et relances
+        bucket = int(time.time()) // self.search_timeout
         try:
-            response = requests.post(
-                self.base_url, 
-                headers=headers, 
-                data=payload,
-                timeout=10
+            return self.cache.get(
+                ("nws", normalized, language),
+                lambda: self._search_news(normalized),
+                bucket=bucket
             )
-            response.raise_for_status()
-            results = response.json()
-            
-            # Filtre les résultats
-            articles = []
-            excluded_terms = ['amazon', 'boutique', 'shop', 'achat', 'prix', 'магазин', 'купить', 'аптека']
-            
-            for item in results.get('organic', []):
-                title = item.get('title', '').lower()
-                link = item.get('link', '').lower()
-                
-                # Ignore les résultats avec des termes commerciaux
-                if any(term in title or term in link for term in excluded_terms):
-                    continue
-                    
-                article = {
-                    'title': item.get('title', ''),
-                    'url': item.get('link', ''),
-                    'snippet': item.get('snippet', '')
-                }
-                articles.append(article)
-                
-            return articles
-            
         except Exception as e:
             print(f"Erreur de recherche: {str(e)}")
             return []
 
-    def search_articles(self, query: str, language: str = 'fr') -> List[Dict]:
-        """Recherche des articles avec la requête donnée"""
-        excluded_terms = [
-            'amazon', 'boutique', 'shop', 'achat', 'prix', 'магазин', 'купить', 'аптека',
-            'buy', 'order', 'purchase', 'discount', 'deal', 'offer', 'promo', 'sale',
-            'заказать', 'скидка', 'акция', 'распродажа', 'цена', 'стоимость'
-        ]
-        
-        payload = json.dumps({
+    def cached_articles(self, query: str, language: str = 'fr') -> Optional[List[Dict]]:
+        """Résultats de search_articles déjà en cache pour la fenêtre courante, sans
+        appel à Serper; None s'il faut lancer la recherche"""
+        bucket = int(time.time()) // self.search_timeout
+        return self.cache.peek(("nws", normalize_query(query), language), bucket)
+
+    def _search_news(self, query: str) -> List[Dict]:
+        """Interroge Serper (actualités) et filtre les résultats commerciaux"""
+        payload = {
             "q": query,
             "num": 10,
             "tbm": "nws"  # Recherche uniquement les actualités
-        })
-        
-        headers = {
-            'X-API-KEY': self.api_key,
-            'Content-Type': 'application/json'
         }
         
-        try:
-            response = requests.post(
-                self.base_url, 
-                headers=headers, 
-                data=payload,
-                timeout=10
+        with span("serper"):
+            results = self.client.search(payload, timeout=self.request_timeout)
+        
+        # Filtre les résultats commerciaux (titre, lien et extrait) et les domaines marchands
+        return [
+            {
+                'title': item.get('title', ''),
+                'url': item.get('link', ''),
+                'snippet': item.get('snippet', '')
+            }
+            for item in self.news_filter.filter_results(
+                results.get('organic', []),
+                ('title', 'link', 'snippet')
             )
-            response.raise_for_status()
-            results = response.json()
-            
-            articles = []
-            for item in results.get('organic', []):
-                title = item.get('title', '').lower()
-                link = item.get('link', '').lower()
-                snippet = item.get('snippet', '').lower()
-                
-                # Ignore les résultats avec des termes commerciaux
-                if any(term in title or term in link or term in snippet for term in excluded_terms):
-                    continue
-                    
-                # Ignore les domaines commerciaux
-                if any(domain in link for domain in ['amazon.', 'ebay.', 'pharmacy.', 'apteka.']):
-                    continue
-                    
-                article = {
-                    'title': item.get('title', ''),
-                    'url': item.get('link', ''),
-                    'snippet': item.get('snippet', '')
-                }
-                articles.append(article)
-                
-            return articles
-            
-        except Exception as e:
-            print(f"Erreur de recherche: {str(e)}")
-            return []
+        ]
 
-    def get_health_articles(self, language: str) -> List[Dict]:
-        """Obtient des articles liés à la santé avec une distribution équilibrée des sujets"""
-        timestamp = int(time.time()) // self.cache_timeout * self.cache_timeout
+    def get_health_articles(self, language: str, timestamp: Optional[int] = None, fresh: bool = False) -> List[Dict]:
+        """Obtient des articles liés à la santé avec une distribution équilibrée des sujets
+        (timestamp: fenêtre de cache visée, la fenêtre courante par défaut; fresh: les
+        résultats en cache d'une fenêtre précédente sont rechargés avant d'être servis)"""
+        if timestamp is None:
+            timestamp = int(time.time()) // self.cache_timeout * self.cache_timeout
         
         queries = {
             'fr': [
@@ -239,12 +275,23 @@ class ArticleSearch:
         seen_urls = set()  # Pour suivre les URLs uniques
         articles_per_topic = {}  # Pour suivre le nombre d'articles par sujet
 
+        # Toutes les requêtes partent en parallèle: le chargement à froid dure
+        # le temps de la requête la plus lente, dans la limite du budget global.
+        # L'échéance commune borne aussi chaque requête HTTP: une requête lente ne garde
+        # pas sa place dans le pool partagé du client après la fin du budget.
+        topic_infos = queries.get(language, queries['fr'])
+        deadline = Deadline(self.articles_budget)
+        results = self.client.run_parallel(
+            [
+                lambda q=topic_info['query']: self._cached_search(q, language, timestamp, fresh, deadline)
+                for topic_info in topic_infos
+            ],
+            budget=self.articles_budget
+        )
+
         # Premier passage - collecte des articles par sujet
-        for topic_info in queries.get(language, queries['fr']):
+        for topic_info, articles in zip(topic_infos, results):
             topic = topic_info['topic']
-            query = topic_info['query']
-            
-            articles = self._cached_search(query, language, timestamp)
             articles_per_topic[topic] = []
             
             if articles:
@@ -252,13 +299,9 @@ class ArticleSearch:
                     url = article['url'].lower()
                     
                     # Vérifie l'URL par rapport aux domaines de confiance et à l'unicité
-                    if url not in seen_urls and any(domain in url for domain in [
-                        'doctissimo.fr', 'passeportsante.net', 'santemagazine.fr',
-                        'psychologies.com', 'yogajournal.fr', 'healthline.com',
-                        'webmd.com', 'medicalnewstoday.com', 'mindful.org',
-                        'health-diet.ru', 'medportal.ru', 'takzdorovo.ru'
-                    ]):
+                    if url not in seen_urls and self.content_filter.is_trusted(url):
                         seen_urls.add(url)
+                        article = dict(article)  # Ne modifie pas l'entrée du cache partagé
                         article['photo'] = self._get_default_image(topic)
                         articles_per_topic[topic].append(article)
 
@@ -277,4 +320,40 @@ class ArticleSearch:
 
         # Mélange les articles pour plus de variété
         random.shuffle(final_articles)
-        return final_articles[:5]  # Renvoie au maximum 5 articles
\ No newline at end of file
+        final_articles = final_articles[:5]  # Renvoie au maximum 5 articles
+        if final_articles:
+            self.save_snapshot(language, final_articles, timestamp)
+        return final_articles
+
+    def save_snapshot(self, language: str, articles: List[Dict], timestamp: int):
+        """Enregistre le dernier résultat valide de la langue dans l'instantané disque"""
+        if not self.snapshot_path:
+            return
+        with _snapshot_lock:
+            snapshot = self.load_snapshot()
+            snapshot[language] = {
+                "bucket": timestamp,
+                "updated_at": int(time.time()),
+                # Seuls les champs affichés sont conservés
+                "articles": [
+                    {'title': a['title'], 'url': a['url'], 'photo': a.get('photo', '')}
+                    for a in articles
+                ]
+            }
+            tmp_path = self.snapshot_path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, self.snapshot_path)
+            except OSError as e:
+                print(f"Erreur d'écriture de l'instantané des articles: {str(e)}")
+
+    def load_snapshot(self) -> Dict[str, Dict]:
+        """Lit l'instantané disque: {langue: {bucket, updated_at, articles}}"""
+        if not self.snapshot_path:
+            return {}
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
\ No newline at end of file
@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from resilience import Deadline, get_upstream
+
+SERPER_URL = "https://google.serper.dev/search"
+
+
+class SerperClient:
+    """Client Serper partagé: connexions keep-alive réutilisées (requests.Session)
+    et pool de threads borné pour lancer plusieurs requêtes en parallèle"""
+
+    def __init__(self, api_key: str, base_url: str = SERPER_URL, max_workers: int = 5,
+                 request_timeout: float = 10):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.request_timeout = request_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            'X-API-KEY': api_key,
+            'Content-Type': 'application/json'
+        })
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="serper")
+
+    def search(self, payload: Dict, timeout: Optional[float] = None,
+               deadline: Optional[Deadline] = None) -> Dict:
+        """Requête unique protégée par le disjoncteur "serper"; chaque tentative est
+        bornée par timeout et par le temps restant avant deadline.
+        Lève resilience.UpstreamUnavailable si Serper est considéré en panne."""
+        timeout = timeout or self.request_timeout
+
+        def post(remaining: float) -> Dict:
+            response = self.session.post(self.base_url, json=payload, timeout=min(timeout, remaining))
+            response.raise_for_status()
+            return response.json()
+
+        # Sans échéance de l'appelant, celle du disjoncteur (timeout x tentatives) s'applique
+        return get_upstream("serper").call(post, deadline)
+
+    def run_parallel(self, calls: List[Callable], budget: Optional[float] = None) -> List:
+        """Exécute les appels en parallèle; ceux qui échouent ou dépassent le budget
+        global (en secondes) renvoient None"""
+        futures = [self._executor.submit(call) for call in calls]
+        done, not_done = wait(futures, timeout=budget)
+        for future in not_done:
+            future.cancel()
+        results = []
+        for future in futures:
+            if future in done and future.exception() is None:
+                results.append(future.result())
+            else:
+                results.append(None)
+        return results
+
+
+_clients: Dict = {}
+_clients_lock = threading.Lock()
+
+
+def get_serper_client(api_key: str, base_url: str = SERPER_URL) -> SerperClient:
+    """Client unique par processus (et par clé/URL), partagé entre les sessions"""
+    with _clients_lock:
+        key = (api_key, base_url)
+        if key not in _clients:
+            _clients[key] = SerperClient(api_key, base_url)
+        return _clients[key]
@@ -0,0 +1,36 @@
+import json
+import os
+from typing import Any
+
+import streamlit as st
+
+_TRUE_VALUES = {"1", "true", "yes", "on", "oui"}
+
+
+def _convert(value: str, default: Any) -> Any:
+    """Convertit une variable d'environnement selon le type de la valeur par défaut"""
+    if isinstance(default, bool):
+        return value.strip().lower() in _TRUE_VALUES
+    if isinstance(default, (dict, list)):
+        return json.loads(value)
+    if isinstance(default, (int, float)):
+        return type(default)(value)
+    return value
+
+
+def get_setting(name: str, default: Any = None, required: bool = False) -> Any:
+    """Réglage lu dans l'environnement (NAME exact ou en majuscules), puis dans
+    st.secrets, sinon default. Permet d'utiliser le moteur hors de Streamlit
+    (traitement par lots, scripts). Lève KeyError si un réglage requis manque."""
+    for key in (name, name.upper()):
+        if key in os.environ:
+            return _convert(os.environ[key], default)
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except FileNotFoundError:
+        # Pas de .streamlit/secrets.toml (exécution hors de l'application)
+        pass
+    if required:
+        raise KeyError(f"Réglage manquant: {name} (variable d'environnement ou secret Streamlit)")
+    return default
@@ -0,0 +1,212 @@
+"""Serveurs HTTP locaux imitant les API externes, pour les benchmarks et tests hors ligne."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import quote
+
+# Domaines de confiance reconnus par ArticleSearch.get_health_articles
+STUB_DOMAINS = ['doctissimo.fr', 'passeportsante.net', 'healthline.com', 'webmd.com', 'medportal.ru']
+
+
+class StubServer:
+    """Serveur HTTP en arrière-plan avec une latence configurable par requête;
+    status != 200 simule une panne du service (réponse d'erreur vide).
+    chunk_delay espace les événements d'une réponse en flux (génération lente).
+    connections compte les connexions TCP ouvertes par les clients (keep-alive),
+    max_in_flight le plus grand nombre de requêtes traitées simultanément."""
+
+    def __init__(self, latency: float = 0.0, port: int = 0, status: int = 200, chunk_delay: float = 0.0):
+        self.latency = latency
+        self.status = status
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                with server._lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    self._respond()
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                delay = server.delay(self.path, body)
+                if delay:
+                    time.sleep(delay)
+                if server.status != 200:
+                    self.send_response(server.status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if body.get("stream"):
+                    events = [f"data: {json.dumps(event)}\n\n" for event in server.handle_stream(self.path, body)]
+                    events.append("data: [DONE]\n\n")
+                    if server.chunk_delay:
+                        # Événements server-sent envoyés un à un; fin du flux à la fermeture
+                        self.send_response(200)
+                        self.send_header("Content-Type", "text/event-stream")
+                        self.send_header("Connection", "close")
+                        self.end_headers()
+                        for event in events:
+                            self.wfile.write(event.encode("utf-8"))
+                            self.wfile.flush()
+                            time.sleep(server.chunk_delay)
+                        self.close_connection = True
+                        return
+                    # Événements server-sent, envoyés en une fois après la latence simulée
+                    payload = "".join(events).encode("utf-8")
+                    content_type = "text/event-stream"
+                else:
+                    payload = json.dumps(server.handle(self.path, body)).encode("utf-8")
+                    content_type = "application/json"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self, path: str, body: Dict) -> float:
+        """Latence simulée d'une requête (surchargée pour ralentir certaines requêtes)"""
+        return self.latency
+
+    def handle(self, path: str, body: Dict) -> Dict:
+        raise NotImplementedError
+
+    def handle_stream(self, path: str, body: Dict) -> List[Dict]:
+        raise NotImplementedError
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StubSerperServer(StubServer):
+    """Imite https://google.serper.dev/search avec des résultats déterministes"""
+
+    @property
+    def url(self) -> str:
+        return super().url + "/search"
+
+    def handle(self, path: str, body: Dict) -> Dict:
+        query = body.get("q", "")
+        organic: List[Dict] = []
+        for i in range(min(int(body.get("num", 10)), 10)):
+            domain = STUB_DOMAINS[(len(query) + i) % len(STUB_DOMAINS)]
+            organic.append({
+                "title": f"{query[:40]} - article {i}",
+                "link": f"https://www.{domain}/{quote(query[:20])}-{i}",
+                "snippet": f"Résumé de l'article {i} sur {query[:40]}"
+            })
+        return {"organic": organic}
+
+
+class StubOpenAIServer(StubServer):
+    """Imite les API chat.completions (réponse complète ou en streaming) et embeddings
+    d'OpenAI; les complétions suivent le format attendu par response_parser
+    (sections 💊, 🌿, ⚠️).
+    Le client openai l'utilise via OPENAI_BASE_URL=server.url."""
+
+    @property
+    def url(self) -> str:
+        return super().url + "/v1"
+
+    @staticmethod
+    def completion_text(question: str) -> str:
+        subject = question[:60]
+        lines = ["1. 💊 Médicaments recommandés:"]
+        lines += [f"- MÉDICAMENT {i} (substance): posologie usuelle pour {subject}, contre-indications, effets indésirables"
+                  for i in range(1, 5)]
+        lines += ["", "2. 🌿 Remèdes naturels:"]
+        lines += [f"- Remède {i}: infusion deux fois par jour" for i in range(1, 5)]
+        lines += ["", "⚠️ Précautions:", "- Consultez un médecin si les symptômes persistent plus de 3 jours"]
+        return "\n".join(lines)
+
+    def _question(self, body: Dict) -> str:
+        messages = body.get("messages") or [{}]
+        return str(messages[-1].get("content", ""))
+
+    def handle(self, path: str, body: Dict) -> Dict:
+        if path.endswith("/embeddings"):
+            return self._embeddings(body)
+        text = self.completion_text(self._question(body))
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(text.split()), "total_tokens": len(text.split())}
+        }
+
+    @staticmethod
+    def _embeddings(body: Dict) -> Dict:
+        from embedding_backends import HashingEmbeddings
+
+        texts = body.get("input") or []
+        texts = [texts] if isinstance(texts, str) else texts
+        vectors = HashingEmbeddings(dimensions=64).embed_documents([str(text) for text in texts])
+        return {
+            "object": "list",
+            "model": body.get("model", "stub"),
+            "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0}
+        }
+
+    def handle_stream(self, path: str, body: Dict) -> List[Dict]:
+        text = self.completion_text(self._question(body))
+        # Un fragment par ligne, comme un flux de tokens regroupés, puis le fragment
+        # final vide qui porte finish_reason
+        deltas = [({"content": line}, None) for line in text.splitlines(keepends=True)]
+        return [
+            {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            for delta, finish_reason in deltas + [({}, "stop")]
+        ]
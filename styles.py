@@ -192,6 +192,57 @@ def load_css():
         backdrop-filter: blur(10px) !important;
     }
 
+    /* Chatbot response styles */
+    .response {
+        display: flex;
+        flex-direction: column;
+        gap: 20px;
+    }
+
+    .response-row {
+        display: flex;
+        gap: 20px;
+        flex-wrap: wrap;
+    }
+
+    .response-card {
+        flex: 1;
+        min-width: 300px;
+        background-color: rgba(47, 53, 66, 0.8);
+        padding: 15px;
+        border-radius: 8px;
+        color: white;
+        margin-bottom: 10px;
+    }
+
+    .response-card ul {
+        list-style-type: none;
+        padding-left: 0;
+    }
+
+    .response-card li {
+        margin-bottom: 10px;
+        padding-left: 20px;
+        position: relative;
+    }
+
+    .response-medications h3 {
+        color: #2196f3;
+    }
+
+    .response-remedies h3 {
+        color: #4caf50;
+    }
+
+    .response-precautions {
+        flex: none;
+        background-color: rgba(255, 152, 0, 0.2);
+    }
+
+    .response-precautions h3 {
+        color: #ff9800;
+    }
+
     /* Search result styles */
     .search-result {
         background-color: rgba(47, 53, 66, 0.8);
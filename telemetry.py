@@ -0,0 +1,259 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Bornes (secondes) des histogrammes de durée exportés au format Prometheus
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_PREFIX = "libercare"
+
+# Réglages par défaut (surchargés via configure_telemetry)
+TELEMETRY_DEFAULTS = {
+    "log_spans": False,      # une ligne JSON par étape sur la sortie standard
+    "log_path": None,        # fichier JSONL où écrire ces lignes (même sans log_spans)
+    "metrics_path": None,    # fichier texte Prometheus réécrit périodiquement
+    "metrics_port": None,    # port d'un endpoint HTTP /metrics
+    "export_interval": 15    # période d'écriture du fichier (secondes)
+}
+
+_local = threading.local()
+
+
+def _stack() -> List[Dict]:
+    """Étapes en cours dans le thread courant (la dernière est le parent des suivantes)"""
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+class SpanStats:
+    """Nombre, erreurs et histogramme cumulatif des durées d'une étape"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+    def add(self, duration: float, error: bool):
+        self.count += 1
+        self.errors += error
+        self.total += duration
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                self.buckets[i] += 1
+
+
+class Telemetry:
+    """Étapes chronométrées (spans) imbriquées par thread, journalisées en JSON et
+    agrégées en histogrammes; les compteurs des caches et des services externes
+    sont lus à la demande auprès des collecteurs enregistrés"""
+
+    def __init__(self, log_spans: bool = False, log_path: Optional[str] = None):
+        self.log_spans = log_spans
+        self.log_path = log_path
+        self._spans: Dict[str, SpanStats] = {}
+        self._collectors: Dict[tuple, Callable[[], Dict[str, Dict]]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Dict]:
+        """Chronomètre le bloc; les attributs renvoyés peuvent être complétés dans le bloc"""
+        stack = _stack()
+        parent = stack[-1] if stack else None
+        record = {
+            "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex[:16],
+            "span_id": uuid.uuid4().hex[:8],
+            "parent_id": parent["span_id"] if parent else None,
+            "name": name,
+            "attributes": attributes
+        }
+        stack.append(record)
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield attributes
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            stack.pop()
+            self._finish(record, time.perf_counter() - start, status)
+
+    def record(self, name: str, duration: float, status: str = "ok", **attributes):
+        """Étape déjà mesurée (par exemple à cheval sur les fragments d'un flux)"""
+        stack = _stack()
+        parent = stack[-1] if stack else None
+        self._finish({
+            "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex[:16],
+            "span_id": uuid.uuid4().hex[:8],
+            "parent_id": parent["span_id"] if parent else None,
+            "name": name,
+            "attributes": attributes
+        }, duration, status)
+
+    def _finish(self, record: Dict, duration: float, status: str):
+        with self._lock:
+            stats = self._spans.get(record["name"])
+            if stats is None:
+                stats = self._spans[record["name"]] = SpanStats()
+            stats.add(duration, status != "ok")
+        if not (self.log_spans or self.log_path):
+            return
+        line = json.dumps(dict(
+            record,
+            event="span",
+            timestamp=round(time.time(), 3),
+            duration_ms=round(duration * 1000, 3),
+            status=status
+        ), ensure_ascii=False, default=str)
+        if self.log_spans:
+            print(line)
+        if self.log_path:
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def register_collector(self, kind: str, collector: Callable[[], Dict[str, Dict]], key: Optional[str] = None):
+        """collector() renvoie {nom: stats} (par exemple upstream_stats); kind devient
+        le préfixe des métriques ("cache", "upstream"...). Un nouvel enregistrement
+        de même kind et key remplace le précédent."""
+        with self._lock:
+            self._collectors[(kind, key)] = collector
+
+    def snapshot(self) -> Dict:
+        """Durées agrégées par étape et compteurs des collecteurs"""
+        with self._lock:
+            spans = {
+                name: {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "mean_ms": round(stats.total / stats.count * 1000, 3) if stats.count else 0.0
+                }
+                for name, stats in self._spans.items()
+            }
+            collectors = dict(self._collectors)
+        snapshot = {"spans": spans}
+        for (kind, _), collector in collectors.items():
+            try:
+                snapshot.setdefault(kind, {}).update(collector())
+            except Exception as e:
+                print(f"Erreur du collecteur de métriques {kind}: {str(e)}")
+        return snapshot
+
+    def prometheus(self) -> str:
+        """Métriques au format texte d'exposition Prometheus"""
+        metric = f"{METRICS_PREFIX}_span_duration_seconds"
+        lines = [
+            f"# HELP {metric} Durée des étapes instrumentées",
+            f"# TYPE {metric} histogram"
+        ]
+        with self._lock:
+            spans = sorted((name, stats.count, stats.errors, stats.total, list(stats.buckets))
+                           for name, stats in self._spans.items())
+        for name, count, _, total, buckets in spans:
+            for bound, value in zip(DURATION_BUCKETS, buckets):
+                lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {value}')
+            lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{span="{name}"}} {count}')
+        errors = f"{METRICS_PREFIX}_span_errors_total"
+        lines += [f"# HELP {errors} Étapes terminées en erreur", f"# TYPE {errors} counter"]
+        lines += [f'{errors}{{span="{name}"}} {count}' for name, _, count, _, _ in spans]
+
+        snapshot = self.snapshot()
+        for kind in sorted(key for key in snapshot if key != "spans"):
+            # Une jauge par statistique numérique: hits, misses, hit_ratio, errors, error_rate...
+            series: Dict[str, List[str]] = {}
+            for name, stats in sorted(snapshot[kind].items()):
+                for key, value in stats.items():
+                    if key == "state":
+                        key, value = "circuit_open", value != "closed"
+                    if isinstance(value, (bool, int, float)):
+                        series.setdefault(key, []).append(f'{{{kind}="{name}"}} {float(value):g}')
+            for key, samples in series.items():
+                gauge = f"{METRICS_PREFIX}_{kind}_{key}"
+                lines.append(f"# TYPE {gauge} gauge")
+                lines += [gauge + sample for sample in samples]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Écriture atomique du fichier lu par le node exporter (textfile collector)"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+
+_telemetry = Telemetry()
+_telemetry_lock = threading.Lock()
+_configured = False
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+
+def span(name: str, **attributes):
+    """Raccourci: get_telemetry().span(name, ...)"""
+    return _telemetry.span(name, **attributes)
+
+
+def record_span(name: str, duration: float, status: str = "ok", **attributes):
+    _telemetry.record(name, duration, status, **attributes)
+
+
+def register_collector(kind: str, collector: Callable[[], Dict[str, Dict]], key: Optional[str] = None):
+    _telemetry.register_collector(kind, collector, key)
+
+
+def _export_loop(path: str, interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            _telemetry.write_prometheus(path)
+        except OSError as e:
+            print(f"Erreur d'écriture des métriques: {str(e)}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _telemetry.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def configure_telemetry(settings: Dict):
+    """Applique une seule fois par processus les réglages (TELEMETRY_DEFAULTS) et démarre
+    les exports demandés: fichier Prometheus et/ou endpoint HTTP /metrics"""
+    global _configured
+    with _telemetry_lock:
+        if _configured:
+            return
+        _configured = True
+        options = dict(TELEMETRY_DEFAULTS, **settings)
+        _telemetry.log_spans = bool(options["log_spans"])
+        _telemetry.log_path = options["log_path"]
+        if options["metrics_path"]:
+            threading.Thread(
+                target=_export_loop,
+                args=(options["metrics_path"], float(options["export_interval"])),
+                name="metrics-export",
+                daemon=True
+            ).start()
+        if options["metrics_port"]:
+            server = ThreadingHTTPServer(("", int(options["metrics_port"])), _MetricsHandler)
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"Métriques Prometheus exposées sur le port {options['metrics_port']} (/metrics)")
@@ -0,0 +1,85 @@
+import time
+from typing import Dict
+
+import resilience
+from article_store import ArticleRefresher, ArticleStore
+from search_utils import ArticleSearch
+from stub_servers import StubSerperServer
+from ttl_cache import TTLCache
+
+
+class GenerationSerperServer(StubSerperServer):
+    """Résultats préfixés par une génération, changée entre deux fenêtres"""
+    generation = 0
+
+    def handle(self, path: str, body: Dict) -> Dict:
+        results = super().handle(path, body)
+        for item in results["organic"]:
+            item["title"] = f"gen{self.generation} {item['title']}"
+        return results
+
+
+def test_ttl_cache_fresh_only_skips_stale_value():
+    cache = TTLCache()
+    assert cache.get("k", lambda: "old", bucket=1) == "old"
+    # Fenêtre suivante: valeur périmée servie, rechargement en arrière-plan
+    assert cache.get("k", lambda: "new", bucket=2) == "old"
+    assert cache.get("k", lambda: "newer", bucket=3, fresh_only=True) == "newer"
+    # Une entrée d'une fenêtre plus récente reste fraîche pour la fenêtre courante
+    assert cache.get("k", lambda: "older", bucket=2) == "newer"
+    # peek ne charge jamais et ignore les valeurs périmées
+    assert cache.peek("k", bucket=3) == "newer" and cache.peek("k", bucket=4) is None
+    assert cache.peek("missing") is None
+
+
+def test_prefetch_publishes_next_window_articles(tmp_path):
+    with GenerationSerperServer() as server:
+        search = ArticleSearch(api_key="test", base_url=server.url,
+                               snapshot_path=str(tmp_path / "articles_snapshot.json"))
+        search.cache = TTLCache()
+        store = ArticleStore()
+        refresher = ArticleRefresher(store, search, languages=("fr",))
+        period = search.cache_timeout
+        window = 1_000 * period
+
+        assert refresher.refresh_once(now=window + 60)
+        articles, _ = store.get("fr")
+        assert store.bucket("fr") == window
+        assert articles and all(a["title"].startswith("gen0 ") for a in articles)
+
+        # Peu avant la fin de la fenêtre: préchargement de la suivante avec le nouveau contenu
+        server.generation = 1
+        assert refresher.refresh_once(now=window + period - 60)
+        articles, _ = store.get("fr")
+        assert store.bucket("fr") == window + period
+        assert articles and all(a["title"].startswith("gen1 ") for a in articles)
+
+        snapshot = search.load_snapshot()["fr"]
+        assert snapshot["bucket"] == window + period
+        assert all(a["title"].startswith("gen1 ") for a in snapshot["articles"])
+
+
+def test_failed_refresh_is_surfaced_and_backs_off(tmp_path, monkeypatch):
+    monkeypatch.setattr(resilience, "_upstreams", {})
+    with GenerationSerperServer(status=503) as server:
+        search = ArticleSearch(api_key="test", base_url=server.url,
+                               snapshot_path=str(tmp_path / "articles_snapshot.json"))
+        search.cache = TTLCache()
+        search.articles_budget = 1.0
+        store = ArticleStore()
+        refresher = ArticleRefresher(store, search, languages=("fr",), retry_delay=60)
+        assert store.failure("fr") is None and refresher.refresh_now()
+
+        # Serper en panne et pas d'instantané: l'échec remplace l'état "Chargement"
+        assert not refresher.refresh_once()
+        assert store.get("fr") == (None, None)
+        assert store.failure("fr")["failed_at"] <= time.time()
+        # Les affichages suivants ne relancent pas le chargement avant retry_delay
+        assert not refresher.refresh_now()
+
+        server.status = 200
+        monkeypatch.setattr(resilience, "_upstreams", {})  # Disjoncteur ouvert par la panne
+        refresher._failed_at -= 60
+        assert refresher.refresh_now()
+        assert refresher.refresh_once()
+        assert store.get("fr")[0] and store.failure("fr") is None
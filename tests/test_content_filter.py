@@ -0,0 +1,71 @@
+import pytest
+
+from content_filter import ContentFilter, get_content_filter
+
+HEALTH_ARTICLES = [
+    ("Dealing With Anxiety: 10 Tips", "https://www.healthline.com/health/dealing-with-anxiety"),
+    ("What Meditation Can Offer You", "https://www.mindful.org/what-meditation-can-offer-you"),
+    ("Ordering your day for better sleep", "https://www.webmd.com/sleep/ordering-your-day"),
+    ("Health promotion and disorders of sleep", "https://www.webmd.com/sleep/sleep-disorders"),
+]
+
+COMMERCIAL = [
+    ("Tisanes bio - Boutique en ligne", "https://www.passeportsante.net/tisanes"),
+    ("Meilleur prix pour le magnésium", "https://www.doctissimo.fr/magnesium"),
+    ("Yoga mats shop", "https://www.healthline.com/yoga"),
+    ("Shopping list for a healthy diet", "https://www.healthline.com/nutrition/healthy-shopping-list"),
+    ("Фитоаптека: лучшие травы", "https://www.medportal.ru/herbs"),
+    ("Купить витамины", "https://www.medportal.ru/vitamins"),
+    ("Vitamin C", "https://www.amazon.fr/vitamin-c"),
+    ("Vitamin D", "https://myshop.com/vitamin-d"),
+]
+
+NEWS_ONLY = [
+    ("Best deals on vitamins", "https://www.webmd.com/a"),
+    ("Offers", "https://www.webmd.com/b"),
+    ("Orders of magnitude", "https://www.webmd.com/c"),
+    ("Big discounts", "https://www.webmd.com/d"),
+    ("Flu shots", "https://www.walgreenspharmacy.com/flu"),
+    ("Bidding guide", "https://www.ebay.com/guide"),
+]
+
+
+def items(rows):
+    return [{"title": title, "link": link, "snippet": ""} for title, link in rows]
+
+
+def test_topic_articles_keep_news_terms():
+    # Les termes et domaines de la recherche d'actualités ne s'appliquent pas aux articles recommandés
+    rows = items(HEALTH_ARTICLES + NEWS_ONLY)
+    assert len(ContentFilter.from_rules().filter_results(rows)) == len(rows)
+
+
+@pytest.mark.parametrize("news", [False, True])
+def test_commercial_results_are_dropped(news):
+    assert ContentFilter.from_rules(news=news).filter_results(items(COMMERCIAL)) == []
+
+
+def test_news_terms_match_as_substrings():
+    assert ContentFilter.from_rules(news=True).filter_results(items(HEALTH_ARTICLES + NEWS_ONLY)) == []
+
+
+def test_news_snippet_is_checked():
+    rows = [{"title": "Vitamines", "link": "https://www.webmd.com/a", "snippet": "Achetez en promo"}]
+    assert ContentFilter.from_rules(news=True).filter_results(rows, ("title", "link", "snippet")) == []
+    assert len(ContentFilter.from_rules(news=True).filter_results(rows)) == 1
+
+
+def test_trusted_domains_by_hostname():
+    content_filter = ContentFilter.from_rules()
+    assert content_filter.is_trusted("https://sante.doctissimo.fr/article")
+    assert not content_filter.is_trusted("https://evil.com/doctissimo.fr")
+
+
+def test_shared_filter_is_keyed_by_rules():
+    default = get_content_filter(news=True)
+    custom = get_content_filter({"news_excluded_terms": []}, news=True)
+    assert custom is not default
+    assert get_content_filter({"news_excluded_terms": []}, news=True) is custom
+    rows = items([("Best deals on vitamins", "https://www.webmd.com/a")])
+    assert default.filter_results(rows) == []
+    assert custom.filter_results(rows) == rows
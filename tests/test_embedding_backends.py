@@ -0,0 +1,91 @@
+import time
+
+import pytest
+from openai import OpenAI
+
+import resilience
+from embedding_backends import CachedEmbeddings, GuardedEmbeddings, HashingEmbeddings
+from resilience import Upstream
+from stub_servers import StubOpenAIServer
+
+
+class ClientEmbeddings:
+    """Même contrat que OpenAIEmbeddings (langchain, openai>=1): model_kwargs est
+    transmis tel quel à embeddings.create"""
+
+    def __init__(self, client: OpenAI, model_kwargs=None):
+        self.client = client
+        self.model_kwargs = model_kwargs or {}
+
+    def copy(self, update):
+        return ClientEmbeddings(self.client, update.get("model_kwargs", self.model_kwargs))
+
+    def embed_documents(self, texts):
+        response = self.client.embeddings.create(model="stub", input=texts, **self.model_kwargs)
+        return [item.embedding for item in response.data]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    """Backend hors ligne qui compte les textes qu'il vectorise"""
+
+    def __init__(self):
+        super().__init__(dimensions=64)
+        self.texts = []
+
+    def embed_documents(self, texts):
+        self.texts += texts
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.texts.append(text)
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    upstream = Upstream("openai_embeddings", retries=0, timeout=0.3)
+    monkeypatch.setattr(resilience, "_upstreams", {"openai_embeddings": upstream})
+    return upstream
+
+
+def test_each_attempt_is_bounded_by_the_upstream_timeout(upstream):
+    with StubOpenAIServer(latency=3.0) as server:
+        # Sans délai propre au client: seul le timeout de la tentative s'applique
+        embeddings = GuardedEmbeddings(ClientEmbeddings(OpenAI(api_key="test", base_url=server.url, max_retries=0)))
+        start = time.perf_counter()
+        with pytest.raises(Exception) as error:
+            embeddings.embed_query("mal de tête")
+        assert time.perf_counter() - start < 1.5
+        assert "Timeout" in type(error.value).__name__
+        assert upstream.breaker.failures == 1
+
+
+def test_fast_backend_returns_vectors(upstream):
+    with StubOpenAIServer() as server:
+        embeddings = GuardedEmbeddings(ClientEmbeddings(OpenAI(api_key="test", base_url=server.url, max_retries=0)))
+        assert len(embeddings.embed_documents(["toux", "fièvre"])) == 2
+        assert len(embeddings.embed_query("toux")) == 64
+
+
+def test_cache_never_embeds_a_text_twice(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    backend = CountingEmbeddings()
+    embeddings = CachedEmbeddings(backend, path)
+
+    first = embeddings.embed_documents(["toux", "fièvre", "toux"])
+    assert backend.texts == ["toux", "fièvre"]
+    assert embeddings.embed_query("fièvre") == first[1]
+    fever, nausea = embeddings.embed_documents(["fièvre", "nausées"])
+    assert fever == first[1]
+    assert backend.texts == ["toux", "fièvre", "nausées"]
+    assert embeddings.stats() == {"hits": 3, "misses": 3, "hit_ratio": 0.5}
+
+    # Réindexation: un nouveau processus rouvre le même fichier SQLite
+    reopened_backend = CountingEmbeddings()
+    reopened = CachedEmbeddings(reopened_backend, path)
+    assert reopened.embed_documents(["toux", "fièvre", "nausées"]) == first[:2] + [nausea]
+    assert reopened_backend.texts == []
+    assert reopened.stats() == {"hits": 3, "misses": 0, "hit_ratio": 1.0}
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from lexical_index import LexicalIndex
+from medication_table import load_medication_table
+
+REPO_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    table = load_medication_table(
+        os.path.join(REPO_DIRECTORY, "medicaments_propre.csv"),
+        str(tmp_path_factory.mktemp("table") / "medications.arrow")
+    )
+    return LexicalIndex(table)
+
+
+def titles(index, rows):
+    return {index.table.row(row)["titre"] for row in rows}
+
+
+@pytest.mark.parametrize("question, name", [
+    ("ABUFÈNE posologie", "ABUFÈNE"),
+    ("doliprane effets indésirables", "DOLIPRANE"),
+    ("kardegic contre-indications", "KARDÉGIC"),
+    ("doliprane grossesse", "DOLIPRANE"),
+    ("quelle est la posologie du doliprane", "DOLIPRANE"),
+    ("advil", "ADVIL"),
+])
+def test_direct_lookup_for_drug_sheet_questions(index, question, name):
+    assert name in titles(index, index.direct_lookup(question))
+
+
+@pytest.mark.parametrize("question", [
+    # Interaction: second médicament
+    "je prends du kardegic, puis-je prendre advil",
+    # Patient et âge
+    "puis-je donner du doliprane à mon bébé de 3 mois",
+    # Comparaison et symptôme
+    "ibuprofène ou paracétamol pour mal de tête enfant",
+    "doliprane pour la fièvre",
+])
+def test_clinical_questions_fall_through_to_model(index, question):
+    assert index.direct_lookup(question) == []
+
+
+def test_find_medications_reports_matched_words(index):
+    rows, size = index.find_medications("je prends du kardegic")
+    assert titles(index, rows) == {"KARDÉGIC"} and size == 1
@@ -0,0 +1,83 @@
+from typing import List
+
+import pandas as pd
+
+from embedding_backends import HashingEmbeddings
+from medical_index import build_medical_documents, file_checksum, index_model_changed, open_medical_index
+
+MEDICATIONS = pd.DataFrame({
+    "titre": ["DOLIPRANE", "ADVIL", "SPASFON"],
+    "famille_medicament": ["Antalgique", "Anti-inflammatoire", "Antispasmodique"],
+    "cas_utilisation": ["fièvre et douleurs", "douleurs et inflammation", "douleurs abdominales"],
+    "posologie": ["1 comprimé", "1 comprimé", "2 comprimés"]
+})
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    """Compte les textes vectorisés"""
+
+    def __init__(self, dimensions: int = 256):
+        super().__init__(dimensions)
+        self.embedded: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def open_index(directory: str, embeddings, csv_checksum: str = "csv"):
+    return open_medical_index(directory, embeddings, csv_checksum, lambda: build_medical_documents(MEDICATIONS))
+
+
+def test_sync_keeps_vectors_of_same_model(tmp_path):
+    directory = str(tmp_path / "medical_db")
+    open_index(directory, HashingEmbeddings(256))
+    # Manifeste à jour: ouverture sans synchronisation
+    _, changes = open_index(directory, HashingEmbeddings(256))
+    assert changes is None
+    # CSV modifié sans changement de contenu indexé: aucun document revectorisé
+    _, changes = open_index(directory, HashingEmbeddings(256), csv_checksum="csv v2")
+    assert changes["added"] == 0 and changes["unchanged"] == 3
+
+
+def test_model_switch_reembeds_every_document(tmp_path):
+    directory = str(tmp_path / "medical_db")
+    store, _ = open_index(directory, HashingEmbeddings(256))
+    assert not index_model_changed(store, directory, "hashing-256")
+    assert index_model_changed(store, directory, "hashing-384")
+
+    embeddings = HashingEmbeddings(384)
+    store, changes = open_index(directory, embeddings)
+    assert changes["added"] == 3 and changes["unchanged"] == 0
+    result = store._collection.query(query_embeddings=[embeddings.embed_query("fièvre")], n_results=1)
+    assert result["metadatas"][0][0]["name"] == "DOLIPRANE"
+
+
+def test_csv_edit_reembeds_only_changed_rows(tmp_path):
+    directory = str(tmp_path / "medical_db")
+    csv_path = str(tmp_path / "medicaments.csv")
+
+    def open_csv(embeddings):
+        return open_medical_index(
+            directory, embeddings, file_checksum(csv_path),
+            lambda: build_medical_documents(pd.read_csv(csv_path))
+        )
+
+    MEDICATIONS.to_csv(csv_path, index=False)
+    store, _ = open_csv(CountingEmbeddings())
+    old_ids = set(store._collection.get()["ids"])
+
+    # Une ligne modifiée (ADVIL), une ligne supprimée (SPASFON), DOLIPRANE inchangé
+    edited = MEDICATIONS.copy()
+    edited.loc[1, "posologie"] = "1 comprimé toutes les 6 heures"
+    edited.drop(index=2).to_csv(csv_path, index=False)
+    embeddings = CountingEmbeddings()
+    store, changes = open_csv(embeddings)
+
+    assert changes == {"added": 1, "deleted": 2, "unchanged": 1, "total": 2}
+    assert len(embeddings.embedded) == 1 and "toutes les 6 heures" in embeddings.embedded[0]
+    stored = store._collection.get(include=["metadatas"])
+    assert sorted(m["name"] for m in stored["metadatas"]) == ["ADVIL", "DOLIPRANE"]
+    # Les identifiants des anciennes versions d'ADVIL et de SPASFON ont disparu
+    assert len(old_ids - set(stored["ids"])) == 2
+    assert len(old_ids & set(stored["ids"])) == 1
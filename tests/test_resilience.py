@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+from openai import OpenAI
+
+import resilience
+from resilience import Deadline, Upstream, UpstreamUnavailable
+from stub_servers import StubOpenAIServer
+
+CHUNK_DELAY = 0.15  # ~12 fragments: environ 2 s de génération par flux
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    upstream = Upstream("openai_chat", max_concurrency=2, failure_threshold=3, retries=0, timeout=10)
+    monkeypatch.setattr(resilience, "_upstreams", {"openai_chat": upstream})
+    return upstream
+
+
+def open_stream(upstream, client):
+    return upstream.stream(lambda timeout: client.chat.completions.create(
+        model="stub", messages=[{"role": "user", "content": "mal de tête"}], stream=True, timeout=timeout
+    ))
+
+
+def test_slow_streams_hold_their_slots_until_consumed(upstream):
+    with StubOpenAIServer(chunk_delay=CHUNK_DELAY) as server:
+        client = OpenAI(api_key="test", base_url=server.url, max_retries=0)
+        opened = threading.Barrier(3)
+        chunks = []
+
+        def consume():
+            with open_stream(upstream, client) as stream:
+                opened.wait()
+                chunks.append(sum(1 for _ in stream))
+
+        threads = [threading.Thread(target=consume) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        opened.wait()
+        # Les deux flux sont ouverts mais pas encore lus: la limite est atteinte
+        with pytest.raises(UpstreamUnavailable):
+            open_stream(upstream, client)
+        for thread in threads:
+            thread.join()
+
+        assert len(chunks) == 2 and all(chunks)
+        assert upstream.rejected == 1
+        # Places rendues après la lecture complète
+        with open_stream(upstream, client) as stream:
+            assert sum(1 for _ in stream) == chunks[0]
+
+
+def test_mid_stream_failure_counts_toward_breaker(upstream):
+    def broken_stream():
+        yield "fragment"
+        raise ConnectionError("connexion interrompue")
+
+    for _ in range(upstream.breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            for _ in upstream.stream(lambda timeout: broken_stream()):
+                pass
+    assert upstream.breaker.state == "open"
+    with pytest.raises(UpstreamUnavailable):
+        upstream.stream(lambda timeout: broken_stream())
+    # Aucune place perdue
+    assert all(upstream._slots.acquire(blocking=False) for _ in range(2))
+
+
+def test_abandoned_stream_releases_its_slot(upstream):
+    stream = upstream.stream(lambda timeout: iter(range(10)))
+    for _ in stream:
+        break
+    stream.close()
+    assert upstream.breaker.failures == 0
+    assert all(upstream._slots.acquire(blocking=False) for _ in range(2))
+
+
+def timing_out(timeout):
+    raise TimeoutError(f"délai de {timeout:.2f} s dépassé")
+
+
+def test_caller_deadline_expiry_does_not_open_breaker(upstream):
+    # Échéance de l'appelant plus courte que le délai du service: atteinte pendant la tentative
+    for _ in range(upstream.breaker.failure_threshold + 1):
+        with pytest.raises(TimeoutError):
+            upstream.call(timing_out, Deadline(0.5))
+    # ... ou avant même la tentative
+    with pytest.raises(UpstreamUnavailable):
+        upstream.call(timing_out, Deadline(0))
+    assert upstream.breaker.state == "closed" and upstream.breaker.failures == 0
+    assert upstream.expired == upstream.breaker.failure_threshold + 2
+
+
+def test_upstream_timeouts_still_open_breaker(upstream):
+    # Sans échéance de l'appelant, le délai du service dépassé est un échec
+    for _ in range(upstream.breaker.failure_threshold):
+        with pytest.raises(TimeoutError):
+            upstream.call(timing_out)
+    assert upstream.breaker.state == "open" and upstream.expired == 0
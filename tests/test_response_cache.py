@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from embedding_backends import HashingEmbeddings, create_embeddings
+from response_cache import SemanticResponseCache
+
+QUESTION = "J'ai mal à la tête et de la fièvre"
+ANSWER = {"medications": ["DOLIPRANE"], "remedies": [], "precautions": []}
+
+
+NEAR_DUPLICATES = [
+    "j'ai mal a la tete et de la fievre",
+    "J'ai  mal à la tête, et de la fièvre !",
+    "j'ai de la fièvre et mal à la tête",
+]
+
+DIFFERENT_SYMPTOMS = [
+    "J'ai mal à la tête et de la toux",
+    "J'ai mal au ventre",
+    "j'ai mal à la gorge",
+    "j'ai des nausées et je vomis",
+]
+
+# Questions voisines mais cliniquement différentes: aucune ne doit recevoir la réponse de l'autre
+DIFFERENT_PAIRS = [
+    ("fièvre enfant", "toux enfant"),
+    ("fièvre enfant", "diarrhée enfant"),
+    ("mal de tête", "mal de dos"),
+    ("mal de gorge", "mal de ventre"),
+    ("douleur au genou", "douleur au dos"),
+    ("toux sèche", "toux grasse"),
+    ("nausées pendant la grossesse", "nausées après le repas"),
+    ("fièvre chez le nourrisson", "fièvre chez l'adulte"),
+    ("allergie au pollen", "allergie aux arachides"),
+]
+
+
+@pytest.fixture
+def cache():
+    # Seuil par défaut du moteur (RESPONSE_CACHE_THRESHOLD), backend hors ligne
+    cache = SemanticResponseCache(threshold=0.95)
+    cache.store(HashingEmbeddings().embed_query(QUESTION), "fr", ANSWER)
+    return cache
+
+
+@pytest.mark.parametrize("question", NEAR_DUPLICATES)
+def test_near_duplicate_phrasings_hit(cache, question):
+    assert cache.lookup(HashingEmbeddings().embed_query(question), "fr") == ANSWER
+
+
+@pytest.mark.parametrize("question", DIFFERENT_SYMPTOMS)
+def test_different_symptoms_miss(cache, question):
+    assert cache.lookup(HashingEmbeddings().embed_query(question), "fr") is None
+
+
+@pytest.mark.parametrize("stored, asked", DIFFERENT_PAIRS + [(b, a) for a, b in DIFFERENT_PAIRS])
+def test_near_but_different_questions_miss(stored, asked):
+    embeddings = HashingEmbeddings()
+    cache = SemanticResponseCache(threshold=0.95)
+    cache.store(embeddings.embed_query(stored), "fr", ANSWER)
+    assert cache.lookup(embeddings.embed_query(asked), "fr") is None
+
+
+def test_disabled_without_threshold():
+    # Réglage par défaut du moteur: RESPONSE_CACHE_THRESHOLD absent
+    cache = SemanticResponseCache()
+    vector = HashingEmbeddings().embed_query(QUESTION)
+    cache.store(vector, "fr", ANSWER)
+    assert cache.lookup(vector, "fr") is None
+    assert cache.stats()["size"] == 0 and not cache.stats()["enabled"]
+
+
+def test_other_language_misses(cache):
+    assert cache.lookup(HashingEmbeddings().embed_query(QUESTION), "en") is None
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.skipif(not os.environ.get("OPENAI_KEY"), reason="OPENAI_KEY requis (modèle d'embedding de production)")
+def test_default_threshold_with_production_embeddings():
+    # Même vérification avec le backend "openai" par défaut (appels payants, hors cache disque)
+    embeddings = create_embeddings("openai", api_key=os.environ["OPENAI_KEY"], cache_path=None)
+    cache = SemanticResponseCache(threshold=0.95)
+    cache.store(embeddings.embed_query(QUESTION), "fr", ANSWER)
+    vectors = embeddings.embed_documents(NEAR_DUPLICATES + DIFFERENT_SYMPTOMS)
+    hits = [cache.lookup(vector, "fr") is not None for vector in vectors]
+    assert hits == [True] * len(NEAR_DUPLICATES) + [False] * len(DIFFERENT_SYMPTOMS)
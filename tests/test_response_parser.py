@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from response_parser import ResponseSections, SectionStreamParser, parse_response
+from stub_servers import StubOpenAIServer
+
+
+def random_chunks(text: str, rng: random.Random):
+    """Découpe le texte en fragments de 1 à 12 caractères, comme un flux de tokens"""
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 12)
+        yield text[position:position + size]
+        position += size
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_stream_parser_matches_full_parse_for_any_chunking(seed):
+    rng = random.Random(seed)
+    text = StubOpenAIServer.completion_text(f"douleurs et fièvre depuis {seed} jours")
+    parser = SectionStreamParser()
+    for chunk in random_chunks(text, rng):
+        parser.feed(chunk)
+    parser.close()
+    expected = parse_response(text)
+    assert ResponseSections(**parser.sections) == expected
+    assert all(expected)
+
+
+def test_stream_parser_one_character_at_a_time():
+    text = StubOpenAIServer.completion_text("toux sèche")
+    parser = SectionStreamParser()
+    for character in text:
+        parser.feed(character)
+    parser.close()
+    assert ResponseSections(**parser.sections) == parse_response(text)
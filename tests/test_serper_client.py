@@ -0,0 +1,82 @@
+import time
+from typing import Dict
+
+import pytest
+
+import resilience
+from search_utils import ArticleSearch
+from stub_servers import StubSerperServer
+from ttl_cache import TTLCache
+
+LATENCY = 0.3
+SLOW_LATENCY = 5.0
+BUDGET = 1.0
+
+
+class SlowTopicServer(StubSerperServer):
+    """Les requêtes du sujet méditation dépassent le budget du chargement des articles"""
+
+    slow = False
+
+    def delay(self, path: str, body: Dict) -> float:
+        if self.slow and "méditation" in body.get("q", ""):
+            return SLOW_LATENCY
+        return self.latency
+
+
+@pytest.fixture(autouse=True)
+def fresh_upstreams(monkeypatch):
+    # Disjoncteurs propres à chaque test
+    monkeypatch.setattr(resilience, "_upstreams", {})
+
+
+@pytest.fixture
+def server():
+    with SlowTopicServer(latency=LATENCY) as server:
+        yield server
+
+
+@pytest.fixture
+def search(server):
+    search = ArticleSearch(api_key="test", base_url=server.url)
+    search.cache = TTLCache()  # Pas de cache partagé entre les tests
+    search.articles_budget = BUDGET
+    return search
+
+
+def test_parallel_fan_out_takes_the_slowest_query(server, search):
+    server.latency = 0  # Connexions ouvertes hors mesure
+    search.get_health_articles("fr", timestamp=0)
+    server.latency = LATENCY
+    server.max_in_flight = 0
+
+    articles = search.get_health_articles("fr", timestamp=1, fresh=True)
+    assert len(articles) == 5
+    # Les 5 sujets sont en cours en même temps côté serveur, pas l'un après l'autre
+    assert server.max_in_flight == 5
+
+
+def test_budget_drops_slow_topic_and_frees_its_request(server, search):
+    server.slow = True
+    start = time.perf_counter()
+    articles = search.get_health_articles("fr", timestamp=0)
+    # Bornes larges: l'échéance (BUDGET) tombe bien avant la réponse lente
+    assert time.perf_counter() - start < SLOW_LATENCY
+    assert articles and all("méditation" not in article["title"] for article in articles)
+
+    # La requête lente est interrompue à l'échéance commune, pas à request_timeout; le
+    # budget de l'appelant épuisé n'est pas un échec de Serper
+    upstream = resilience.get_upstream("serper")
+    while upstream.expired == 0 and time.perf_counter() - start < SLOW_LATENCY:
+        time.sleep(0.05)
+    assert upstream.expired == 1
+    assert time.perf_counter() - start < SLOW_LATENCY
+    assert upstream.errors == 0 and upstream.breaker.failures == 0
+
+
+def test_connections_are_reused(server, search):
+    server.latency = 0.05
+    for bucket in range(4):
+        assert len(search.get_health_articles("fr", timestamp=bucket, fresh=True)) == 5
+    assert server.requests == 20
+    assert server.connections <= 5
@@ -0,0 +1,58 @@
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from worker_pool import JobRunner
+
+
+def test_timed_out_job_keeps_its_slot_until_the_thread_ends():
+    runner = JobRunner(limits={"slow": 1})
+    finished = threading.Event()
+
+    def slow():
+        time.sleep(0.5)
+        finished.set()
+
+    first = runner.submit("slow", slow, timeout=0.1)
+    second = runner.submit("slow", lambda: finished.is_set(), timeout=5)
+    with pytest.raises((FutureTimeoutError, TimeoutError)):
+        first.result(timeout=5)
+    # Le second appel n'a démarré qu'une fois le premier thread terminé
+    assert second.result(timeout=5) is True
+    stats = runner.stats()["slow"]
+    assert stats["timeouts"] == 1 and stats["completed"] == 1
+
+
+def test_stats_while_jobs_record():
+    runner = JobRunner(limits={"fast": 4})
+    runner.submit("fast", lambda: None).result()
+    stop = threading.Event()
+
+    def submit_jobs():
+        while not stop.is_set():
+            runner.submit("fast", lambda: None).result()
+
+    threads = [threading.Thread(target=submit_jobs) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(200):
+            assert runner.stats()["fast"]["limit"] == 4
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def test_job_cancelled_during_delay_never_runs():
+    runner = JobRunner()
+    calls = []
+    superseded = runner.submit("search", calls.append, "old", delay=0.3)
+    current = runner.submit("search", calls.append, "new", delay=0.1)
+    superseded.cancel()
+    current.result(timeout=5)
+    time.sleep(0.4)
+    assert calls == ["new"]
+    assert runner.stats()["search"]["cancelled"] == 1
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Cache partagé par le processus, avec fenêtres de fraîcheur et stale-while-revalidate.
+
+    Chaque entrée est associée à la fenêtre (bucket) dans laquelle elle a été chargée:
+    - même fenêtre (ou fenêtre plus récente, déjà préchargée): la valeur est fraîche
+      et servie directement;
+    - fenêtre précédente mais âge < max_stale: la valeur est servie immédiatement et
+      rechargée en arrière-plan;
+    - sinon le chargement est fait de façon synchrone.
+    Les chargements concurrents d'une même clé sont fusionnés (single-flight) et les
+    entrées les moins récemment utilisées sont évincées au-delà de max_entries.
+    Avec persist_path, les clés doivent être des tuples sérialisables en JSON."""
+
+    def __init__(self, max_entries: int = 256, max_stale: float = 7 * 86400,
+                 persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self.persist_path = persist_path
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+        if persist_path:
+            self._load()
+
+    def get(self, key: Hashable, loader: Callable[[], Any], bucket: int = 0, fresh_only: bool = False) -> Any:
+        """Renvoie la valeur de la clé, en appelant loader() si nécessaire.
+        Les exceptions de loader sont propagées uniquement s'il n'y a rien à servir.
+        fresh_only: une valeur d'une fenêtre précédente n'est jamais servie, le
+        chargement est synchrone (préchargement de la fenêtre suivante)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["stored_at"] > self.max_stale:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry["bucket"] >= bucket:
+                    self.hits += 1
+                    return entry["value"]
+                if not fresh_only:
+                    self.stale_hits += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = self._refresher.submit(self._refresh, key, loader, bucket)
+                    return entry["value"]
+            self.misses += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            value = future.result()
+            if fresh_only:
+                # Le chargement attendu visait peut-être une fenêtre plus ancienne
+                return self.get(key, loader, bucket, fresh_only)
+            return value
+        try:
+            value = loader()
+            self._put(key, value, bucket)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def peek(self, key: Hashable, bucket: int = 0) -> Any:
+        """Valeur fraîche de la clé sans jamais la charger, ou None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["bucket"] < bucket or time.time() - entry["stored_at"] > self.max_stale:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any], bucket: int):
+        try:
+            value = loader()
+            self._put(key, value, bucket)
+            return value
+        except Exception as e:
+            # La valeur périmée reste servie jusqu'au prochain essai; l'erreur est
+            # transmise aux appels qui attendaient ce chargement
+            print(f"Erreur de rafraîchissement du cache: {str(e)}")
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _put(self, key: Hashable, value: Any, bucket: int):
+        with self._lock:
+            self._entries[key] = {"value": value, "bucket": bucket, "stored_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.persist_path:
+            self._save()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / total, 3) if total else 0.0,
+            "size": len(self._entries)
+        }
+
+    def _save(self):
+        with self._lock:
+            rows = [[list(key), entry] for key, entry in self._entries.items()]
+        with self._save_lock:
+            tmp_path = self.persist_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+
+    def _load(self):
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for key, entry in rows:
+                self._entries[tuple(key)] = entry
@@ -0,0 +1,101 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+
+NUMPY_INDEX_DIRECTORY = "./medical_db/numpy_index"
+VECTORS_FILENAME = "vectors.npy"
+DOCUMENTS_FILENAME = "documents.json"
+
+
+class NumpyVectorIndex:
+    """Recherche exacte en mémoire pour un petit corpus: une matrice float32 normalisée,
+    un produit matrice-vecteur et argpartition pour les k meilleurs résultats.
+    Expose la même méthode similarity_search_by_vector que le wrapper Chroma."""
+
+    def __init__(self, vectors: np.ndarray, documents: List[Document], stamp: Optional[Dict] = None):
+        if len(vectors) != len(documents):
+            raise ValueError("Le nombre de vecteurs et de documents diffère")
+        self.vectors = vectors
+        self.documents = documents
+        self.stamp = stamp or {}
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @classmethod
+    def from_chroma(cls, vectorstore, stamp: Optional[Dict] = None) -> "NumpyVectorIndex":
+        """Exporte les vecteurs déjà calculés de la collection Chroma (aucun appel d'embedding)"""
+        data = vectorstore._collection.get(include=["embeddings", "documents", "metadatas"])
+        vectors = cls._normalize(np.asarray(data["embeddings"], dtype=np.float32))
+        documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(data["documents"], data["metadatas"])
+        ]
+        return cls(vectors, documents, stamp)
+
+    def save(self, directory: str = NUMPY_INDEX_DIRECTORY):
+        """Enregistre la matrice normalisée (.npy) et les documents (.json)"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, VECTORS_FILENAME), np.ascontiguousarray(self.vectors))
+        payload = {
+            "stamp": self.stamp,
+            "documents": [
+                {"page_content": doc.page_content, "metadata": doc.metadata}
+                for doc in self.documents
+            ]
+        }
+        tmp_path = os.path.join(directory, DOCUMENTS_FILENAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(directory, DOCUMENTS_FILENAME))
+
+    @classmethod
+    def load(cls, directory: str = NUMPY_INDEX_DIRECTORY, stamp: Optional[Dict] = None) -> Optional["NumpyVectorIndex"]:
+        """Charge l'index en mappant la matrice en mémoire; None s'il est absent ou
+        si son tampon ne correspond pas à celui attendu"""
+        try:
+            with open(os.path.join(directory, DOCUMENTS_FILENAME), encoding="utf-8") as f:
+                payload = json.load(f)
+            if stamp is not None and payload.get("stamp") != stamp:
+                return None
+            vectors = np.load(os.path.join(directory, VECTORS_FILENAME), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        documents = [Document(**doc) for doc in payload["documents"]]
+        return cls(vectors, documents, payload.get("stamp"))
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4):
+        """Renvoie les k documents les plus proches avec leur similarité cosinus"""
+        if not self.documents:
+            return []
+        query = self._normalize(embedding)
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+    def similarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 4) -> List[List[Document]]:
+        """Recherche groupée: un seul produit matrice-matrice pour toutes les requêtes"""
+        if not self.documents or not len(embeddings):
+            return [[] for _ in embeddings]
+        queries = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        scores = queries @ self.vectors.T
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        top = np.take_along_axis(top, order, axis=1)
+        return [[self.documents[i] for i in row] for row in top]
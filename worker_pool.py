@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from telemetry import register_collector
+
+# Nombre maximal de tâches simultanées par type de tâche
+DEFAULT_JOB_LIMITS = {
+    "articles": 2,
+    "search": 4
+}
+
+
+class JobRunner:
+    """Boucle asyncio et pool de threads uniques du processus.
+
+    Les scripts Streamlit y soumettent des tâches bloquantes (articles, recherches)
+    et récupèrent un concurrent.futures.Future qu'ils peuvent interroger sans créer
+    de boucle ni de pool à chaque exécution."""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, max_workers: int = 8):
+        self.limits = dict(DEFAULT_JOB_LIMITS, **(limits or {}))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._executor)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._metrics: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="job-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, func: Callable, *args, timeout: Optional[float] = None,
+               delay: float = 0.0) -> Future:
+        """Planifie func(*args) dans la file kind; timeout borne l'exécution (secondes).
+        delay retarde le démarrage sans occuper de thread: un Future annulé
+        pendant ce délai n'exécute jamais func (anti-rebond)."""
+        self._record(kind, "submitted")
+        coroutine = self._run(kind, partial(func, *args), timeout, time.perf_counter(), delay)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def _run(self, kind: str, call: Callable, timeout: Optional[float], submitted_at: float,
+                   delay: float = 0.0):
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self._record(kind, "cancelled")
+                raise
+        # Exécuté dans la boucle: pas de concurrence sur la création des sémaphores
+        semaphore = self._semaphores.get(kind)
+        if semaphore is None:
+            semaphore = self._semaphores[kind] = asyncio.Semaphore(self.limits.get(kind, 1))
+        await semaphore.acquire()
+        started_at = time.perf_counter()
+        self._record(kind, "queue", started_at - submitted_at)
+        task = self._loop.run_in_executor(None, call)
+        # La place n'est rendue qu'à la fin du thread: après un délai dépassé, l'appel
+        # continue de s'exécuter et compte toujours dans la limite de sa file
+        task.add_done_callback(partial(self._release, semaphore))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self._record(kind, "timeouts")
+            raise
+        except Exception:
+            self._record(kind, "failed")
+            raise
+        self._record(kind, "completed", time.perf_counter() - started_at)
+        return result
+
+    @staticmethod
+    def _release(semaphore: asyncio.Semaphore, task: asyncio.Future):
+        if not task.cancelled():
+            task.exception()  # Erreur déjà comptée, ou appel abandonné après un délai dépassé
+        semaphore.release()
+
+    def _record(self, kind: str, event: str, seconds: Optional[float] = None):
+        with self._lock:
+            metrics = self._metrics.setdefault(kind, {
+                "submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "cancelled": 0,
+                "durations": deque(maxlen=500), "queue": deque(maxlen=500)
+            })
+            if seconds is None:
+                metrics[event] += 1
+            elif event == "queue":
+                metrics["queue"].append(seconds)
+            else:
+                metrics[event] += 1
+                metrics["durations"].append(seconds)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Compteurs et durées (ms) par type de tâche"""
+        with self._lock:
+            # Copie des files sous le verrou: _record peut y ajouter une durée à tout moment
+            snapshot = {
+                kind: dict(metrics, durations=list(metrics["durations"]), queue=list(metrics["queue"]))
+                for kind, metrics in self._metrics.items()
+            }
+        report = {}
+        for kind, metrics in snapshot.items():
+            durations = np.asarray(metrics.pop("durations")) * 1000
+            queue = np.asarray(metrics.pop("queue")) * 1000
+            metrics["limit"] = self.limits.get(kind, 1)
+            if len(durations):
+                metrics["p50_ms"] = round(float(np.percentile(durations, 50)), 1)
+                metrics["p95_ms"] = round(float(np.percentile(durations, 95)), 1)
+            if len(queue):
+                metrics["queue_p95_ms"] = round(float(np.percentile(queue, 95)), 1)
+            report[kind] = metrics
+        return report
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner(limits: Optional[Dict[str, int]] = None) -> JobRunner:
+    """Exécuteur unique du processus, créé au premier appel"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(limits)
+            register_collector("job", _runner.stats)
+        return _runner